@@ -0,0 +1,106 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import yfinance as yf
+from config import BAR_STORE_DIR, BAR_STORE_OFFLINE
+
+
+"""
+bar_store.py keeps a local copy of the yfinance bars, one Parquet file per ticker and interval (bar_store/NVDA_1h.parquet).
+Only the bars after the last cached one are downloaded and merged in, and in offline mode everything is read from the store.
+"""
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def store_path(ticker, interval, root=BAR_STORE_DIR):
+    return os.path.join(root, f"{ticker}_{interval}.parquet")
+
+
+def load_bars(ticker, interval, root=BAR_STORE_DIR):
+    """
+    Read the cached bars of a ticker.
+
+    Returns:
+        bars (pandas DataFrame): Bars indexed by UTC 'Datetime', empty if nothing is cached
+        covered_start (pandas Timestamp): Earliest start date the store was filled from, None if nothing is cached
+    """
+    path = store_path(ticker, interval, root)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=PRICE_COLUMNS, index=pd.DatetimeIndex([], tz="UTC", name="Datetime")), None
+
+    table = pq.read_table(path)
+    covered_start = pd.Timestamp(table.schema.metadata[b"covered_start"].decode())
+    return table.to_pandas(), covered_start
+
+
+def save_bars(bars, ticker, interval, covered_start, root=BAR_STORE_DIR):
+    path = store_path(ticker, interval, root)
+    table = pa.Table.from_pandas(bars)
+    table = table.replace_schema_metadata({**table.schema.metadata, b"covered_start": covered_start.strftime("%Y-%m-%d").encode()})
+
+    # Write to a temporary file first, so an interrupted run never leaves a broken store
+    os.makedirs(root, exist_ok=True)
+    pq.write_table(table, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def download_bars(ticker, start, end, interval):
+    # Same call as before the store, with the (Price, Ticker) columns of yfinance flattened to the price names
+    bars = yf.download(tickers=ticker, start=start.strftime("%Y-%m-%d"), end=end.strftime("%Y-%m-%d"), interval=interval)
+    if isinstance(bars.columns, pd.MultiIndex):
+        bars.columns = bars.columns.get_level_values(0)
+    bars.index = pd.to_datetime(bars.index, utc=True)
+    bars.index.name = "Datetime"
+    return bars[[col for col in PRICE_COLUMNS if col in bars.columns]]
+
+
+def get_bars(ticker, start, end, interval="1h", offline=BAR_STORE_OFFLINE, root=BAR_STORE_DIR):
+    """
+    Bars of a ticker between start and end (end excluded), like yf.download, served from the local store.
+    Only the part that is not cached yet is downloaded: everything from start if the store begins later,
+    and the tail from the day of the last cached bar, which is downloaded again in case it was incomplete.
+
+    Args:
+        ticker (str): yfinance ticker, e.g. "NVDA" or "^DJI"
+        start (str or datetime): First date
+        end (str or datetime): Date after the last one
+        interval (str): yfinance interval
+        offline (bool): Read from the store only, without network access
+        root (str): Folder of the store
+
+    Returns:
+        pandas DataFrame: Open, High, Low, Close, Volume indexed by UTC 'Datetime'
+    """
+    start = pd.Timestamp(start).normalize().tz_localize(None)
+    end = pd.Timestamp(end).normalize().tz_localize(None)
+    bars, covered_start = load_bars(ticker, interval, root)
+
+    if offline:
+        if bars.empty:
+            raise ValueError(f"No cached {interval} bars of {ticker} in {root} for the offline mode")
+        print(f"Offline mode, {ticker} {interval} bars read from {store_path(ticker, interval, root)}")
+    else:
+        downloads = []
+        if bars.empty or start < covered_start:
+            # Nothing cached, or the request begins before the store: download the whole range
+            downloads.append(download_bars(ticker, start, end, interval))
+            covered_start = start if covered_start is None else min(start, covered_start)
+        else:
+            last_day = bars.index.max().tz_convert(None).normalize()
+            if last_day < end:
+                downloads.append(download_bars(ticker, last_day, end, interval))
+
+        downloads = [df for df in downloads if not df.empty]
+        if downloads:
+            new_bars = pd.concat(downloads)
+            bars = pd.concat([bars, new_bars]) if not bars.empty else new_bars
+            bars = bars[~bars.index.duplicated(keep='last')].sort_index()
+            save_bars(bars, ticker, interval, covered_start, root)
+            print(f"Downloaded {sum(len(df) for df in downloads)} {ticker} {interval} bars, {len(bars)} in the store")
+        elif bars.empty:
+            raise ValueError(f"No {interval} bars of {ticker} downloaded between {start.date()} and {end.date()}")
+
+    dates = bars.index.tz_convert(None)
+    return bars[(dates >= start) & (dates < end)]
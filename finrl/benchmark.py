@@ -0,0 +1,396 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from finrl.config import INDICATORS
+from utils import process_df_for_mvo, StockReturnsComputing, calculate_mean_cov, ledoit_wolf_cov, rolling_mean_cov
+from utils import load_trade, load_aggregated_risk_score, load_trained_a2c, load_trained_sac
+from utils import predict_agent_1, predict_agent_2, predict_all_agents
+from custom_env import RiskAwareStockTradingEnv
+from finrl.agents.stablebaselines3.models import DRLAgent
+from training import setup_environment
+
+
+"""
+benchmark.py contains performance checks of the inference helpers that are run manually, not by the workflow.
+
+    python benchmark.py mvo
+    python benchmark.py returns
+    python benchmark.py env
+    python benchmark.py inference
+    python benchmark.py train
+"""
+
+
+def legacy_process_df_for_mvo(df):
+    """
+    process_df_for_mvo before the pivot reshape (one .loc row assignment per date), kept as the reference.
+    """
+    df = df.sort_values(['date', 'tic'], ignore_index=True)[['date', 'tic', 'close']]
+    df['date'] = pd.to_datetime(df['date'], utc=True)
+    tickers = df['tic'].unique()
+    mvo = pd.DataFrame(columns=tickers)
+
+    for i in range(df.shape[0] // len(tickers)):
+        temp = df.iloc[i * len(tickers):(i + 1) * len(tickers)]
+        date = temp['date'].iloc[0]
+        mvo.loc[date] = temp['close'].values
+
+    mvo.index = pd.to_datetime(mvo.index, utc=True)
+
+    return mvo
+
+
+def legacy_stock_returns_computing(StockPrice, Rows, Columns):
+    """
+    StockReturnsComputing before vectorization (one Python iteration per price), kept as the reference.
+    """
+    StockReturn = np.zeros([Rows - 1, Columns])
+    for j in range(Columns):
+        for i in range(Rows - 1):
+            StockReturn[i, j] = ((StockPrice[i + 1, j] - StockPrice[i, j]) / StockPrice[i, j]) * 100
+
+    return StockReturn
+
+
+def legacy_calculate_mean_cov(arStockPrices, rows, cols):
+    arReturns = legacy_stock_returns_computing(arStockPrices, rows, cols)
+    meanReturns = np.mean(arReturns, axis=0).reshape(-1)
+    covReturns = np.cov(arReturns, rowvar=False) + np.eye(cols) * 1e-6
+
+    return meanReturns, covReturns
+
+
+class LegacyRiskAwareStockTradingEnv(RiskAwareStockTradingEnv):
+    """
+    RiskAwareStockTradingEnv.step before the precomputed weights (DataFrame lookup and if/elif chain per step), kept as the reference.
+    """
+
+    def step(self, actions):
+        state, reward, done, truncated, info = super(RiskAwareStockTradingEnv, self).step(actions)
+
+        day_idx = max(0, self.day - 1)
+        risk_score = self.df.loc[day_idx, self.risk_score_col] if self.risk_score_col in self.df.columns else 0
+        risk_score = risk_score if pd.notnull(risk_score) else 0
+        state[0] = state[0] * self._get_risk_scaling_factor(risk_score)
+
+        return state, reward, done, truncated, info
+
+    def _get_risk_scaling_factor(self, risk_score):
+        if risk_score == 0:
+            return 1
+        elif 1 <= risk_score <= 2:
+            return 15
+        elif risk_score == 3:
+            return 10
+        elif 4 <= risk_score <= 5:
+            return -5
+        else:
+            return 1
+
+
+def synthetic_trade(n_tickers, n_hours, seed=0):
+    """
+    Hourly trade data in the format of trade_data.csv (date strings with +00:00, one row per date and ticker).
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2020-01-02 14:30", periods=n_hours, freq="h", tz="UTC")
+    tickers = [f"T{i:02d}" for i in range(n_tickers)]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(n_hours, n_tickers)), axis=0))
+    return pd.DataFrame({
+        "date": np.repeat(dates.astype(str), n_tickers),
+        "tic": np.tile(tickers, n_hours),
+        "close": close.reshape(-1),
+    })
+
+
+def best_time(func, repeat):
+    """
+    Run func repeat times and return its result with the fastest of the run times, which is the least disturbed by other load.
+    """
+    seconds = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        seconds.append(time.perf_counter() - start_time)
+    return result, min(seconds)
+
+
+def check_faster(name, new_seconds, old_seconds):
+    # A benchmark run fails when the new path is not faster than the one it replaces
+    assert new_seconds < old_seconds, f"{name}: new path took {new_seconds:.4f}s, not faster than the old {old_seconds:.4f}s"
+
+
+def benchmark_mvo(sizes, legacy_max_rows, repeat=3):
+    """
+    Time the pivot reshape against the row-by-row reshape for (tickers, hours) sizes and check both give the same matrix.
+
+    Args:
+        sizes (list): (number of tickers, number of hourly bars) pairs
+        legacy_max_rows (int): The row-by-row version is only run up to this many input rows, it is too slow beyond
+        repeat (int): Runs of each version, the fastest one is reported
+
+    Returns:
+        dict: (tickers, hours) -> (pivot seconds, row-by-row seconds or None)
+    """
+    results = {}
+    for n_tickers, n_hours in sizes:
+        trade = synthetic_trade(n_tickers, n_hours)
+
+        pivot, pivot_seconds = best_time(lambda: process_df_for_mvo(trade), repeat)
+
+        legacy_seconds = None
+        if len(trade) <= legacy_max_rows:
+            legacy, legacy_seconds = best_time(lambda: legacy_process_df_for_mvo(trade), repeat)
+            assert np.allclose(pivot.to_numpy(), legacy.to_numpy(dtype=float))
+            assert pivot.index.equals(legacy.index) and list(pivot.columns) == list(legacy.columns)
+            check_faster(f"pivot reshape, {n_tickers}x{n_hours}", pivot_seconds, legacy_seconds)
+
+        results[(n_tickers, n_hours)] = (pivot_seconds, legacy_seconds)
+        legacy_text = f"{legacy_seconds:.3f}s ({legacy_seconds / pivot_seconds:.0f}x slower)" if legacy_seconds else "skipped"
+        print(f"{n_tickers:>3} tickers x {n_hours:>6} hours: pivot {pivot_seconds:.3f}s, row by row {legacy_text}")
+
+    return results
+
+
+def benchmark_returns(sizes, window, step, repeat=3):
+    """
+    Time the vectorized returns/covariance against the nested loop and check the results, then check the
+    Ledoit-Wolf and rolling-window modes against straightforward per-window computations.
+
+    Args:
+        sizes (list): (number of tickers, number of hourly bars) pairs
+        window (int): Rolling window length in bars
+        step (int): Bars between two rolling windows
+        repeat (int): Runs of each version, the fastest one is reported
+
+    Returns:
+        dict: (tickers, hours) -> (vectorized seconds, nested loop seconds)
+    """
+    results = {}
+    for n_tickers, n_hours in sizes:
+        prices = process_df_for_mvo(synthetic_trade(n_tickers, n_hours)).to_numpy()
+        rows, cols = prices.shape
+
+        (mean, cov), vectorized_seconds = best_time(lambda: calculate_mean_cov(prices, rows, cols, shrinkage=None), repeat)
+        (legacy_mean, legacy_cov), legacy_seconds = best_time(lambda: legacy_calculate_mean_cov(prices, rows, cols), repeat)
+
+        assert np.allclose(StockReturnsComputing(prices, rows, cols), legacy_stock_returns_computing(prices, rows, cols), rtol=1e-12, atol=1e-12)
+        assert np.allclose(mean, legacy_mean, rtol=1e-12, atol=1e-12)
+        assert np.allclose(cov, np.atleast_2d(legacy_cov), rtol=1e-10, atol=1e-12)
+        check_faster(f"returns/covariance, {n_tickers}x{n_hours}", vectorized_seconds, legacy_seconds)
+
+        results[(n_tickers, n_hours)] = (vectorized_seconds, legacy_seconds)
+        print(f"{n_tickers:>3} tickers x {n_hours:>6} hours: vectorized {vectorized_seconds:.4f}s, "
+              f"nested loop {legacy_seconds:.3f}s ({legacy_seconds / vectorized_seconds:.0f}x slower), max |cov diff| "
+              f"{np.abs(cov - legacy_cov).max():.1e}")
+
+        returns = StockReturnsComputing(prices, rows, cols)
+        if len(returns) < window:
+            continue
+
+        # Ledoit-Wolf: closed form on the full sample and the same formula written out per window
+        lw = ledoit_wolf_cov(returns)
+        try:
+            from sklearn.covariance import ledoit_wolf
+            assert np.allclose(lw, ledoit_wolf(returns)[0], rtol=1e-10, atol=1e-12)
+        except ImportError:
+            pass
+
+        ends = range(window, len(returns) + 1, step)
+        (rolling_mean, rolling_cov), rolling_seconds = best_time(lambda: rolling_mean_cov(returns, window, step, shrinkage=None), repeat)
+        (_, rolling_lw_cov), rolling_lw_seconds = best_time(lambda: rolling_mean_cov(returns, window, step, shrinkage="ledoit_wolf"), repeat)
+        loop_cov, loop_seconds = best_time(lambda: [
+            np.atleast_2d(np.cov(returns[end - window:end], rowvar=False)) + np.eye(cols) * 1e-6 for end in ends
+        ], repeat)
+        loop_lw, loop_lw_seconds = best_time(lambda: [ledoit_wolf_cov(returns[end - window:end]) + np.eye(cols) * 1e-6 for end in ends], repeat)
+
+        assert len(rolling_cov) == len(loop_cov)
+        assert np.allclose(rolling_mean, [returns[end - window:end].mean(axis=0) for end in ends], rtol=1e-12, atol=1e-12)
+        assert np.allclose(rolling_cov, loop_cov, rtol=1e-10, atol=1e-12)
+        assert np.allclose(rolling_lw_cov, loop_lw, rtol=1e-10, atol=1e-12)
+        print(f"{'':>22}  {len(rolling_cov)} rolling windows of {window} bars: batched {rolling_seconds:.4f}s "
+              f"(Ledoit-Wolf {rolling_lw_seconds:.4f}s), loop over windows {loop_seconds:.4f}s (Ledoit-Wolf {loop_lw_seconds:.4f}s)")
+        check_faster(f"rolling covariance, {n_tickers}x{n_hours}", rolling_seconds, loop_seconds)
+        check_faster(f"rolling Ledoit-Wolf, {n_tickers}x{n_hours}", rolling_lw_seconds, loop_lw_seconds)
+
+    return results
+
+
+def run_env(env_class, df, env_kwargs, n_steps, seed):
+    """
+    Step an environment with random actions for n_steps (resetting at the end of the data).
+
+    Returns:
+        list: state[0] after every step
+        float: Seconds spent in step()
+    """
+    env = env_class(df=df, **env_kwargs)
+    env.reset()
+    rng = np.random.default_rng(seed)
+    actions = rng.uniform(-1, 1, size=(n_steps, env.action_space.shape[0]))
+
+    first_values = []
+    seconds = 0.0
+    for action in actions:
+        start_time = time.perf_counter()
+        state, _, done, _, _ = env.step(action)
+        seconds += time.perf_counter() - start_time
+        first_values.append(state[0])
+        if done:
+            env.reset()
+
+    return first_values, seconds
+
+
+def benchmark_env(n_steps):
+    """
+    Steps/sec of Agent 2's environment with the precomputed risk weights against the per-step DataFrame lookup,
+    on trade_data.csv with the aggregated risk scores, and the same check over every score from -1 to 6 in 0.5 steps.
+
+    Args:
+        n_steps (int): Number of steps per environment
+
+    Returns:
+        tuple: (array lookup steps/sec, DataFrame lookup steps/sec)
+    """
+    scores = np.append(np.arange(-1, 6.5, 0.5), np.nan)
+    legacy = LegacyRiskAwareStockTradingEnv.__new__(LegacyRiskAwareStockTradingEnv)
+    expected = [legacy._get_risk_scaling_factor(score if pd.notnull(score) else 0) for score in scores]
+    assert [RiskAwareStockTradingEnv._get_risk_scaling_factor(None, score) for score in scores] == expected
+
+    trade = load_trade()
+    trade_sentiment = load_aggregated_risk_score(trade)
+    stock_dimension = len(trade_sentiment.tic.unique())
+    env_kwargs = {
+        "hmax": 500,
+        "initial_amount": 1000000,
+        "num_stock_shares": [0] * stock_dimension,
+        "buy_cost_pct": [0.001] * stock_dimension,
+        "sell_cost_pct": [0.001] * stock_dimension,
+        "state_space": 1 + 2 * stock_dimension + len(INDICATORS) * stock_dimension,
+        "stock_dim": stock_dimension,
+        "tech_indicator_list": INDICATORS,
+        "action_space": stock_dimension,
+        "reward_scaling": 1e-10,
+    }
+
+    array_values, array_seconds = run_env(RiskAwareStockTradingEnv, trade_sentiment, env_kwargs, n_steps, seed=0)
+    legacy_values, legacy_seconds = run_env(LegacyRiskAwareStockTradingEnv, trade_sentiment, env_kwargs, n_steps, seed=0)
+    assert np.array_equal(array_values, legacy_values)
+
+    array_rate, legacy_rate = n_steps / array_seconds, n_steps / legacy_seconds
+    print(f"{n_steps} steps on {trade_sentiment.date.nunique()} days: precomputed weights {array_rate:.0f} steps/sec, "
+          f"DataFrame lookup {legacy_rate:.0f} steps/sec ({array_rate / legacy_rate:.2f}x), same states")
+
+    return array_rate, legacy_rate
+
+
+def benchmark_inference(processes):
+    """
+    Wall time of the four sequential DRL_prediction runs against the lockstep engine, in this process and with
+    worker processes, on trade_data.csv with the pre-trained models, checking all give the same account values.
+
+    Args:
+        processes (list): Numbers of worker processes to try for the lockstep engine
+
+    Returns:
+        dict: "sequential" or number of processes -> seconds
+    """
+    trade = load_trade()
+    trade_sentiment = load_aggregated_risk_score(trade)
+    trained_models = {"a2c": load_trained_a2c(), "sac": load_trained_sac()}
+
+    start_time = time.perf_counter()
+    sequential = {
+        model_name: (predict_agent_1(trade, model)[0], predict_agent_2(trade, model, trade_sentiment)[0])
+        for model_name, model in trained_models.items()
+    }
+    results = {"sequential": time.perf_counter() - start_time}
+    print(f"sequential DRL_prediction x4: {results['sequential']:.2f}s")
+
+    for n in processes:
+        start_time = time.perf_counter()
+        lockstep = predict_all_agents(trade, trade_sentiment, trained_models, processes=n)
+        results[n] = time.perf_counter() - start_time
+
+        max_diff = 0.0
+        for model_name, accounts in sequential.items():
+            for expected, actual in zip(accounts, lockstep[model_name]):
+                assert expected["date"].tolist() == actual["date"].tolist()
+                max_diff = max(max_diff, np.abs(expected["account_value"].to_numpy() - actual["account_value"].to_numpy()).max())
+        print(f"lockstep, {n} process(es): {results[n]:.2f}s ({results['sequential'] / results[n]:.1f}x), "
+              f"max account value difference {max_diff:.2e}")
+
+    return results
+
+
+def benchmark_train(n_envs_list, model_name, timesteps):
+    """
+    Training steps/sec of a model for different numbers of parallel environments (not saved).
+
+    Args:
+        n_envs_list (list): Numbers of environments to try, 1 is the single DummyVecEnv of before
+        model_name (str): "a2c" or "sac"
+        timesteps (int): Timesteps to train for each configuration
+
+    Returns:
+        dict: number of environments -> steps/sec
+    """
+    results = {}
+    for n_envs in n_envs_list:
+        env_train = setup_environment(n_envs)
+        env_train.reset()
+        start_hours = env_train.get_attr("day")
+
+        model = DRLAgent(env=env_train).get_model(model_name, verbose=0)
+        start_time = time.perf_counter()
+        model.learn(total_timesteps=timesteps)
+        results[n_envs] = model.num_timesteps / (time.perf_counter() - start_time)
+        env_train.close()
+
+        print(f"{model_name} with {n_envs} environment(s): {results[n_envs]:.0f} steps/sec "
+              f"({results[n_envs] / results[n_envs_list[0]]:.2f}x), first episodes start at hours {start_hours}")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the finrl inference stage")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    mvo_parser = subparsers.add_parser("mvo", help="pivot vs row-by-row price matrix reshape")
+    # From the current trade window (1 ticker x ~570 hours) up to 30 tickers x ~5 years of hourly bars
+    mvo_parser.add_argument("--sizes", nargs="+", default=["1x570", "5x2000", "10x4000", "30x8800"],
+                            help="TICKERSxHOURS pairs")
+    mvo_parser.add_argument("--legacy-max-rows", type=int, default=50000)
+
+    returns_parser = subparsers.add_parser("returns", help="vectorized vs nested-loop returns and covariance")
+    returns_parser.add_argument("--sizes", nargs="+", default=["1x570", "5x2000", "10x4000", "30x8800"],
+                                help="TICKERSxHOURS pairs")
+    # One week of hourly bars per window, one window per trading day
+    returns_parser.add_argument("--window", type=int, default=35)
+    returns_parser.add_argument("--step", type=int, default=7)
+
+    env_parser = subparsers.add_parser("env", help="precomputed vs per-step risk weights in Agent 2's environment")
+    env_parser.add_argument("--steps", type=int, default=5000)
+
+    inference_parser = subparsers.add_parser("inference", help="sequential vs lockstep prediction of the four agents")
+    inference_parser.add_argument("--processes", type=int, nargs="+", default=[1, 2])
+
+    train_parser = subparsers.add_parser("train", help="training steps/sec for different numbers of parallel environments")
+    train_parser.add_argument("--n-envs", type=int, nargs="+", default=[1, 2, 4])
+    train_parser.add_argument("--model", choices=["a2c", "sac"], default="a2c")
+    train_parser.add_argument("--timesteps", type=int, default=20000)
+
+    args = parser.parse_args()
+    if args.command == "mvo":
+        benchmark_mvo([tuple(map(int, size.split("x"))) for size in args.sizes], args.legacy_max_rows)
+    elif args.command == "returns":
+        benchmark_returns([tuple(map(int, size.split("x"))) for size in args.sizes], args.window, args.step)
+    elif args.command == "env":
+        benchmark_env(args.steps)
+    elif args.command == "inference":
+        benchmark_inference(args.processes)
+    elif args.command == "train":
+        benchmark_train(args.n_envs, args.model, args.timesteps)
@@ -2,4 +2,24 @@
 TRAIN_CSV = "train_data.csv"
 TRADE_CSV = "trade_data.csv"
 AGGREGATED_RISK_SCORE = "../sentiment/aggregated_risk_scores.csv"
-RESULTS_CSV = "results.csv"
\ No newline at end of file
+RESULTS_CSV = "results.csv"
+
+# Covariance estimator of the MVO: None for the sample covariance, or "ledoit_wolf" for
+# Ledoit-Wolf shrinkage towards a scaled identity (more stable with many tickers)
+MVO_COV_SHRINKAGE = None
+
+# Worker processes of the inference: 1 steps all four (model, agent) combinations in this process,
+# 2 runs A2C and SAC in parallel processes (only faster when the trade window outweighs the start-up of a process)
+INFERENCE_PROCESSES = 1
+
+# Training: number of parallel environments (SubprocVecEnv, one process each, 1 for the single DummyVecEnv),
+# and the minimum number of hourly steps left after the random start of an episode.
+# More than 1 gives fewer gradient updates for the same total_timesteps (SAC train_freq, A2C n_steps are per env)
+# and random episode starts, so the agents train differently
+TRAIN_N_ENVS = 1
+TRAIN_MIN_EPISODE_STEPS = 700
+TRAIN_SEED = 0
+
+# Local Parquet store of the yfinance bars, one file per ticker and interval; offline mode reads only from it
+BAR_STORE_DIR = "bar_store"
+BAR_STORE_OFFLINE = False
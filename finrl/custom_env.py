@@ -1,5 +1,39 @@
 from finrl.meta.env_stock_trading.env_stocktrading import StockTradingEnv
-import pandas as pd
+import numpy as np
+
+
+# Scaling factor of state[0] for the integer risk scores 0..5, indexed by the score
+RISK_WEIGHT_TABLE = np.array([
+    1,   # 0: No change
+    15,  # 1: More optimistic
+    15,  # 2: More optimistic
+    10,  # 3: Slight optimistic
+    -5,  # 4: Slight caution
+    -5,  # 5: Slight caution
+])
+
+
+def risk_scaling_factors(risk_scores):
+    """
+    Map risk scores to the weights applied to state[0], for a whole array of scores at once.
+    Integer scores 0..5 are looked up in RISK_WEIGHT_TABLE, scores between 1 and 2 or between 4 and 5 get the weight
+    of their range, everything else (missing, negative, above 5, other fractions) gets 1.
+
+    Args:
+        risk_scores (array-like): Risk scores, NaN for missing
+
+    Returns:
+        numpy array: Scaling factor for each score
+    """
+    scores = np.asarray(risk_scores, dtype=float)
+    factors = np.ones(scores.shape)
+
+    in_table = (scores >= 0) & (scores < len(RISK_WEIGHT_TABLE)) & (scores == np.floor(scores))
+    factors[in_table] = RISK_WEIGHT_TABLE[scores[in_table].astype(int)]
+    factors[(scores > 1) & (scores < 2)] = RISK_WEIGHT_TABLE[1]
+    factors[(scores > 4) & (scores < 5)] = RISK_WEIGHT_TABLE[4]
+
+    return factors
 
 
 class RiskAwareStockTradingEnv(StockTradingEnv):
@@ -8,6 +42,7 @@ class RiskAwareStockTradingEnv(StockTradingEnv):
     This class inherits the StockTradingEnv class from FinRL, and only overwrittes the step() function to give 'reward' or 'penalty' to the agent depending on the risk scores. 
     The amount of 'reward' or 'penalty' is indicated by a given weight value. 
     For example, a lower risk score signals optimistic chance in its trade, thus the agent's state[0] is multiplied with a high weight ('reward').
+    The weight of every day is computed once when the environment is created, so step() only reads an array.
     
     Args:
         StockTradingEnv (class): provided by FinRL 
@@ -17,17 +52,23 @@ class RiskAwareStockTradingEnv(StockTradingEnv):
     def __init__(self, df, **kwargs):
         self.risk_score_col = 'risk_score'
         super().__init__(df, **kwargs)
+        self.risk_weights = self._get_risk_weights()
+
+    def _get_risk_weights(self):
+        # FinRL indexes the df by day number, with one row per ticker. The risk score is per date, so the first row of each day is used
+        days = self.df.index.to_numpy()
+        weights = np.ones(days.max() + 1 if len(days) else 1)
+        if self.risk_score_col in self.df.columns:
+            first_rows = ~self.df.index.duplicated()
+            weights[days[first_rows]] = risk_scaling_factors(self.df[self.risk_score_col].to_numpy()[first_rows])
+
+        return weights
 
     def step(self, actions):
         state, reward, done, truncated, info = super().step(actions)
 
-        # Get the risk score
-        day_idx = max(0, self.day - 1)
-        risk_score = self.df.loc[day_idx, self.risk_score_col] if self.risk_score_col in self.df.columns else 0
-        risk_score = risk_score if pd.notnull(risk_score) else 0
-        
         # Inject risk into state indirectly 
-        risk_weight = self._get_risk_scaling_factor(risk_score)
+        risk_weight = self.risk_weights[max(0, self.day - 1)]
 
         # State[0] is a normalized or scaled value, part of the observation used by the agent.
         state[0] = state[0] * risk_weight
@@ -35,13 +76,43 @@ class RiskAwareStockTradingEnv(StockTradingEnv):
         return state, reward, done, truncated, info
 
     def _get_risk_scaling_factor(self, risk_score):
-        if risk_score == 0:
-            return 1  # No change
-        elif 1 <= risk_score <= 2:
-            return 15  # More optimistic
-        elif risk_score == 3:
-            return 10  # Slight optimistic
-        elif 4 <= risk_score <= 5:
-            return -5  # Slight caution
-        else:
-            return 1
+        return risk_scaling_factors(risk_score).item()
+
+
+class RandomStartStockTradingEnv(StockTradingEnv):
+    """
+    Training environment that starts every episode at a random hour of the train window instead of the first one,
+    so parallel environments see different parts of the data at the same time.
+    An episode still runs until the end of the data, and always has at least min_episode_steps steps.
+
+    Args:
+        StockTradingEnv (class): provided by FinRL
+        seed (int): Seed of the start offsets, give each parallel environment its own
+        min_episode_steps (int): Latest start is this many steps before the end of the data
+
+    """
+
+    def __init__(self, df, seed=None, min_episode_steps=1, **kwargs):
+        self.start_rng = np.random.default_rng(seed)
+        self.min_episode_steps = min_episode_steps
+        super().__init__(df, **kwargs)
+
+    def reset(self, *, seed=None, options=None):
+        super().reset(seed=seed, options=options)
+        if seed is not None:
+            self.start_rng = np.random.default_rng(seed)
+
+        last_start = max(0, len(self.df.index.unique()) - 1 - self.min_episode_steps)
+        self.day = int(self.start_rng.integers(0, last_start + 1))
+        self.data = self.df.loc[self.day, :]
+        self.state = self._initiate_state()
+
+        # Same bookkeeping as StockTradingEnv.reset, for the new first day
+        if self.initial:
+            self.asset_memory = [
+                self.initial_amount
+                + np.sum(np.array(self.num_stock_shares) * np.array(self.state[1 : 1 + self.stock_dim]))
+            ]
+        self.date_memory = [self._get_date()]
+
+        return self.state, {}
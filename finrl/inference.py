@@ -1,9 +1,9 @@
 from utils import *
-from config import RESULTS_CSV
+from config import RESULTS_CSV, BAR_STORE_OFFLINE
 import sys
 
 
-def get_inference():
+def get_inference(offline=BAR_STORE_OFFLINE):
     """
     This function executes the steps in the inference stage.
     It loads the train_data.csv and trade_data.csv obtained from the processing stage, and loads the aggregated_risk_scores.csv from the /sentiment part.
@@ -12,7 +12,7 @@ def get_inference():
     It merges the results from Agent 1, Agent 2, MVO, and DJIA into results.csv to be plotted in the final dashboard.
 
     Args:
-        None
+        offline (bool): Read the DJIA hourly data only from the local bar store, without network access
         
     """ 
     try:
@@ -20,33 +20,16 @@ def get_inference():
         trade = load_trade()
         print("Loaded train and trade csv.")
         
-        # Load the pre-trained A2C model
-        trained_a2c = load_trained_a2c()
-        print("Loaded trained A2C model.")
-        
-        # Load the pre-trained SAC model
-        trained_sac = load_trained_sac()
-        print("Loaded trained SAC model.")
-         
         # Load aggregated_risk_scores
         trade_sentiment = load_aggregated_risk_score(trade)
         print("Loaded aggregated risk scores and merged with trade data.")
 
-        # Predict A2C Agent 1
-        df_account_value_a2c_agent1, _ = predict_agent_1(trade, trained_a2c)
-        print("A2C Agent 1 prediction done.")
-        
-        # Predict SAC Agent 1
-        df_account_value_sac_agent1, _ = predict_agent_1(trade, trained_sac)
-        print("SAC Agent 1 prediction done.")
-        
-        # Predict A2C Agent 2
-        df_account_value_a2c_agent2, _ = predict_agent_2(trade, trained_a2c, trade_sentiment)
-        print("A2C Agent 2 prediction done.")
-        
-        # Predict SAC Agent 2
-        df_account_value_sac_agent2, _ = predict_agent_2(trade, trained_sac, trade_sentiment)
-        print("SAC Agent 2 prediction done.")
+        # Predict A2C and SAC, Agent 1 and Agent 2, with the environments of each model stepped in lockstep
+        # The pre-trained models are loaded from trained_models/ (by the worker processes if INFERENCE_PROCESSES > 1)
+        predictions = predict_all_agents(trade, trade_sentiment)
+        df_account_value_a2c_agent1, df_account_value_a2c_agent2 = predictions["a2c"]
+        df_account_value_sac_agent1, df_account_value_sac_agent2 = predictions["sac"]
+        print("A2C and SAC Agent 1 and Agent 2 predictions done.")
 
         # Calculate Mean Variance Optimization (MVO)
         StockData, arStockPrices, rows, cols = calculate_mvo(trade)
@@ -61,7 +44,7 @@ def get_inference():
         print("MVO calculation done.")
         
         # Get hourly data from DJIA benchmark index
-        dji = get_djia_index(trade)
+        dji = get_djia_index(trade, offline)
         print("Loaded DJIA hourly data.")
         
         # Merge results
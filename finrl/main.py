@@ -1,15 +1,22 @@
 from processing import process
 from training import train_a2c, train_sac
 from inference import get_inference
+from config import BAR_STORE_OFFLINE
+import argparse
 import sys
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FinRL pipeline: processing, training and inference")
+    parser.add_argument("--offline", action="store_true", default=BAR_STORE_OFFLINE,
+                        help="use only the yfinance bars already in the local bar store, without network access")
+    args = parser.parse_args()
+
     try:
         '''
         Stage 1: processing.py
         '''
-        process()
+        process(args.offline)
         print("Stage 1: Processing completed.")
         print("---------------------------------------------")
         
@@ -27,7 +34,7 @@ if __name__ == "__main__":
         '''
         Stage 3: inference.py
         '''
-        get_inference()
+        get_inference(args.offline)
         print("Stage 3: Inference completed.")
         print("---------------------------------------------")
         
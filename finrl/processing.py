@@ -1,21 +1,22 @@
 import pandas as pd
-import yfinance as yf
 import itertools
 import datetime
 from finrl.meta.preprocessor.preprocessors import FeatureEngineer, data_split
 from finrl.config import INDICATORS
-from config import TRAIN_CSV, TRADE_CSV
+from config import TRAIN_CSV, TRADE_CSV, BAR_STORE_OFFLINE
+from bar_store import get_bars
 import sys
 
 
-def process():
+def process(offline=BAR_STORE_OFFLINE):
     """
     This function helps to download hourly NVDA stock data from yahoo finance 600 days ago from the current date.
     After loading the hourly data, it is pre-processed and combined with stock indicators using FinRL's FeatureEngineer.
     Finally, it splits the data into train/trade set (80%-20%) and saves them into csv files for the next stage.
+    The hourly data is kept in the local bar store, so only the hours since the last run are downloaded.
     
     Args:
-        None
+        offline (bool): Use only the bars already in the local bar store, without network access
         
     """
     try:
@@ -29,14 +30,9 @@ def process():
         print("Start date: ", start_date)
         print("End date: ", end_date)
 
-        # Download NVDA hourly data
-        print(f'Downloading hourly data from yfinance between {start_date} - {end_date}')
-        nvda_df_yf = yf.download(
-            tickers="NVDA",
-            start=start_date,
-            end=end_date,
-            interval="1h",
-        )
+        # Download NVDA hourly data (missing hours only, the rest comes from the bar store)
+        print(f'Loading hourly data from yfinance between {start_date} - {end_date}')
+        nvda_df_yf = get_bars("NVDA", start_date, end_date, interval="1h", offline=offline)
 
         # Reset index and add 'tic' column for FinRL compatibility
         nvda_df_yf.columns = nvda_df_yf.columns.get_level_values(0)
@@ -1,18 +1,23 @@
 import pandas as pd
+import time
+from functools import partial
 from finrl.meta.env_stock_trading.env_stocktrading import StockTradingEnv
 from finrl.agents.stablebaselines3.models import DRLAgent
 from stable_baselines3.common.logger import configure
+from stable_baselines3.common.vec_env import SubprocVecEnv
 from finrl.config import INDICATORS, TRAINED_MODEL_DIR, RESULTS_DIR
-from config import TRAIN_CSV
+from config import TRAIN_CSV, TRAIN_N_ENVS, TRAIN_MIN_EPISODE_STEPS, TRAIN_SEED
+from custom_env import RandomStartStockTradingEnv
 import sys
 
 
-def setup_environment():
+def setup_environment(n_envs=TRAIN_N_ENVS):
     """
     This function loads the train dataset and sets up the environment for training.
+    With n_envs > 1, the environments run in parallel processes (SubprocVecEnv) and every episode starts at a random hour of the train window.
 
     Args:
-        None
+        n_envs (int): Number of parallel environments, 1 for a single StockTradingEnv starting at the first hour
         
     """ 
     try: 
@@ -42,8 +47,17 @@ def setup_environment():
             "reward_scaling": 1e-10              # Smaller for hourly granularity
         }
 
-        e_train_gym = StockTradingEnv(df = train, **env_kwargs)
-        env_train, _ = e_train_gym.get_sb_env()
+        if n_envs <= 1:
+            e_train_gym = StockTradingEnv(df = train, **env_kwargs)
+            env_train, _ = e_train_gym.get_sb_env()
+            return env_train
+
+        # Each environment gets its own seed, so their start offsets differ
+        env_train = SubprocVecEnv([
+            partial(RandomStartStockTradingEnv, df=train, seed=TRAIN_SEED + rank, min_episode_steps=TRAIN_MIN_EPISODE_STEPS, **env_kwargs)
+            for rank in range(n_envs)
+        ])
+        print(f"Training on {n_envs} parallel environments with random start offsets")
         
         return env_train
     
@@ -69,11 +83,14 @@ def train_a2c():
         model_a2c = agent_a2c.get_model("a2c")
 
         # Train the agent
+        start_time = time.perf_counter()
         trained_a2c = agent_a2c.train_model(
             model=model_a2c,
             tb_log_name='a2c_hourly',
             total_timesteps=150000   # Slightly more steps due to smaller interval
         )
+        print(f"A2C trained with {env_train_a2c.num_envs} environment(s): {trained_a2c.num_timesteps / (time.perf_counter() - start_time):.0f} steps/sec")
+        env_train_a2c.close()
 
         trained_a2c.save(TRAINED_MODEL_DIR + "/agent_a2c")
     
@@ -112,11 +129,14 @@ def train_sac():
         model_sac.set_logger(new_logger_sac)
 
         # Train the agent
+        start_time = time.perf_counter()
         trained_sac = agent_sac.train_model(
             model=model_sac,
             tb_log_name='sac_hourly',
             total_timesteps=150000   
         )
+        print(f"SAC trained with {env_train_sac.num_envs} environment(s): {trained_sac.num_timesteps / (time.perf_counter() - start_time):.0f} steps/sec")
+        env_train_sac.close()
 
         trained_sac.save(TRAINED_MODEL_DIR + "/agent_sac")
     
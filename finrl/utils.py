@@ -1,12 +1,18 @@
+import io
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-import yfinance as yf
 from finrl.meta.env_stock_trading.env_stocktrading import StockTradingEnv
 from finrl.agents.stablebaselines3.models import DRLAgent
 from stable_baselines3 import A2C, SAC
+from stable_baselines3.common.vec_env import DummyVecEnv
 from pypfopt.efficient_frontier import EfficientFrontier
 from finrl.config import INDICATORS, TRAINED_MODEL_DIR
-from config import TRADE_CSV, AGGREGATED_RISK_SCORE
+from numpy.lib.stride_tricks import sliding_window_view
+from config import TRADE_CSV, AGGREGATED_RISK_SCORE, MVO_COV_SHRINKAGE, INFERENCE_PROCESSES, BAR_STORE_OFFLINE
+from bar_store import get_bars
 from custom_env import RiskAwareStockTradingEnv
 
 
@@ -34,8 +40,56 @@ def load_trained_sac():
     return trained_sac
 
 
+def _seek_first_row(f, key, size):
+    """
+    Binary search in a CSV sorted by its first column for the byte offset of the first row whose key is >= key.
+    Keys are compared as bytes, which is chronological for the fixed-width "YYYY-MM-DD HH:MM:SS" datetimes.
+    """
+    f.seek(0)
+    f.readline()
+    low, high = f.tell(), size
+    while low < high:
+        mid = (low + high) // 2
+        # Move to the start of the first row beginning at or after mid
+        f.seek(mid - 1)
+        f.readline()
+        row = f.readline()
+        if row and row[:len(key)] < key:
+            low = f.tell()
+        else:
+            high = mid
+    return low
+
+
+def read_sorted_csv_range(path, start, end):
+    """
+    Read only the rows of a datetime sorted CSV (aggregated_risk_scores.csv) between start and end (both inclusive),
+    found by binary search on byte offsets instead of parsing the whole history.
+
+    Args:
+        path (str): CSV sorted by its first column, "YYYY-MM-DD HH:MM:SS" datetimes
+        start (pandas Timestamp): First datetime to load
+        end (pandas Timestamp): Last datetime to load
+
+    Returns:
+        pandas DataFrame: Rows of the CSV within the range, with the CSV header as columns
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        start_offset = _seek_first_row(f, start.strftime('%Y-%m-%d %H:%M:%S').encode(), size)
+        # Everything up to (but not including) the first row after end
+        end_offset = _seek_first_row(f, (end + pd.Timedelta(seconds=1)).strftime('%Y-%m-%d %H:%M:%S').encode(), size)
+        f.seek(start_offset)
+        rows = f.read(max(0, end_offset - start_offset))
+
+    return pd.read_csv(io.BytesIO(header + rows))
+
+
 def load_aggregated_risk_score(trade):
-    sentiment_df = pd.read_csv(AGGREGATED_RISK_SCORE)
+    # Only the trade window is read from aggregated_risk_scores.csv, which is kept sorted by datetime
+    trade_dates = pd.to_datetime(trade['date'], utc=True).dt.tz_convert(None)
+    sentiment_df = read_sorted_csv_range(AGGREGATED_RISK_SCORE, trade_dates.min(), trade_dates.max())
         
     # Rename columns for consistency
     sentiment_df = sentiment_df.rename(columns={"datetime": "date", "avg_weighted_score": "risk_score"})
@@ -55,11 +109,11 @@ def load_aggregated_risk_score(trade):
     return trade_sentiment
 
 
-def predict_agent_1(trade, trained_model):
-    # Setup the environment
+def get_env_kwargs(trade):
+    # Environment settings shared by Agent 1 and Agent 2
     stock_dimension = len(trade.tic.unique())
     state_space = 1 + 2 * stock_dimension + len(INDICATORS) * stock_dimension
-    
+
     env_kwargs = {
     "hmax": 500,
     "initial_amount": 1000000,
@@ -73,6 +127,13 @@ def predict_agent_1(trade, trained_model):
     "reward_scaling": 1e-10,
     }
 
+    return env_kwargs
+
+
+def predict_agent_1(trade, trained_model):
+    # Setup the environment
+    env_kwargs = get_env_kwargs(trade)
+
     e_trade_gym = StockTradingEnv(df=trade, **env_kwargs)
     env_trade, _ = e_trade_gym.get_sb_env()
 
@@ -86,21 +147,7 @@ def predict_agent_1(trade, trained_model):
 
 def predict_agent_2(trade, trained_model, trade_sentiment):
     # Setup the environment
-    stock_dimension_agent2 = len(trade.tic.unique())
-    state_space_agent2 = 1 + 2 * stock_dimension_agent2 + len(INDICATORS) * stock_dimension_agent2
-
-    env_kwargs_agent2 = {
-    "hmax": 500,
-    "initial_amount": 1000000,
-    "num_stock_shares": [0] * stock_dimension_agent2,
-    "buy_cost_pct": [0.001] * stock_dimension_agent2,
-    "sell_cost_pct": [0.001] * stock_dimension_agent2,
-    "state_space": state_space_agent2,
-    "stock_dim": stock_dimension_agent2,
-    "tech_indicator_list": INDICATORS,
-    "action_space": stock_dimension_agent2,
-    "reward_scaling": 1e-10,
-    }
+    env_kwargs_agent2 = get_env_kwargs(trade)
 
     # Initialize custom environment with trade_sentiment data
     e_trade_sentiment = RiskAwareStockTradingEnv(df=trade_sentiment, **env_kwargs_agent2)
@@ -115,19 +162,114 @@ def predict_agent_2(trade, trained_model, trade_sentiment):
     return df_account_value_agent2, df_actions_agent2
 
 
+def predict_lockstep(model, environments, deterministic=True):
+    """
+    DRLAgent.DRL_prediction for several environments of the same model at once.
+    The environments are stepped together in one vectorized env, so every step runs a single model.predict on the
+    stacked observations instead of one call per environment. The memories are saved one step before the end,
+    like DRL_prediction does, because the vectorized env resets an environment when it is done.
+
+    Args:
+        model (stable_baselines3 model): Trained A2C or SAC model
+        environments (list): StockTradingEnv instances over the same trading days
+
+    Returns:
+        list: (account value DataFrame, actions DataFrame) for each environment
+    """
+    n_days = len(environments[0].df.index.unique())
+    if any(len(env.df.index.unique()) != n_days for env in environments):
+        raise ValueError("Environments stepped in lockstep must have the same number of days")
+
+    vec_env = DummyVecEnv([lambda env=env: env for env in environments])
+    obs = vec_env.reset()
+    max_steps = n_days - 1
+    account_memory = None
+    actions_memory = None
+
+    for i in range(n_days):
+        actions, _ = model.predict(obs, deterministic=deterministic)
+        obs, _, dones, _ = vec_env.step(actions)
+
+        if i == max_steps - 1:
+            account_memory = vec_env.env_method(method_name="save_asset_memory")
+            actions_memory = vec_env.env_method(method_name="save_action_memory")
+
+        if dones[0]:
+            print("hit end!")
+            break
+
+    return list(zip(account_memory, actions_memory))
+
+
+MODEL_LOADERS = {"a2c": load_trained_a2c, "sac": load_trained_sac}
+
+
+def predict_model_agents(model_name, trade, trade_sentiment, trained_model=None):
+    """
+    Agent 1 (stock data) and Agent 2 (stock data + risk scores) predictions of one model, stepped in lockstep.
+
+    Args:
+        model_name (str): Key of MODEL_LOADERS, the model is loaded from trained_models/ if trained_model is not given
+        trade (pandas DataFrame): Trade data
+        trade_sentiment (pandas DataFrame): Trade data merged with the risk scores
+        trained_model (stable_baselines3 model): Already loaded model
+
+    Returns:
+        tuple: (Agent 1 account value DataFrame, Agent 2 account value DataFrame)
+    """
+    if trained_model is None:
+        trained_model = MODEL_LOADERS[model_name]()
+
+    env_kwargs = get_env_kwargs(trade)
+    environments = [
+        StockTradingEnv(df=trade, **env_kwargs),
+        RiskAwareStockTradingEnv(df=trade_sentiment, **env_kwargs),
+    ]
+    (df_account_value_agent1, _), (df_account_value_agent2, _) = predict_lockstep(trained_model, environments)
+
+    return df_account_value_agent1, df_account_value_agent2
+
+
+def predict_all_agents(trade, trade_sentiment, trained_models=None, processes=INFERENCE_PROCESSES):
+    """
+    Account values of Agent 1 and Agent 2 for every model in MODEL_LOADERS.
+    With processes > 1 the models run in parallel worker processes, each loading its own model. The workers are
+    started with "spawn", since forking a process that already ran torch can hang.
+
+    Args:
+        trade (pandas DataFrame): Trade data
+        trade_sentiment (pandas DataFrame): Trade data merged with the risk scores
+        trained_models (dict): Already loaded models by name, only used when running in this process
+        processes (int): Number of worker processes, 1 to run everything in this process
+
+    Returns:
+        dict: model name -> (Agent 1 account value DataFrame, Agent 2 account value DataFrame)
+    """
+    trained_models = trained_models or {}
+    if processes <= 1:
+        return {
+            model_name: predict_model_agents(model_name, trade, trade_sentiment, trained_models.get(model_name))
+            for model_name in MODEL_LOADERS
+        }
+
+    with ProcessPoolExecutor(max_workers=min(processes, len(MODEL_LOADERS)),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {
+            model_name: pool.submit(predict_model_agents, model_name, trade, trade_sentiment)
+            for model_name in MODEL_LOADERS
+        }
+        return {model_name: future.result() for model_name, future in futures.items()}
+
+
 def process_df_for_mvo(df):
+    # Reshape the long (date, tic, close) rows into a date x ticker price matrix in one pivot
     df = df.sort_values(['date', 'tic'], ignore_index=True)[['date', 'tic', 'close']]
     df['date'] = pd.to_datetime(df['date'], utc=True)
     tickers = df['tic'].unique()
-    mvo = pd.DataFrame(columns=tickers)
+    mvo = df.pivot(index='date', columns='tic', values='close').reindex(columns=tickers)
+    mvo.index.name = None
+    mvo.columns.name = None
 
-    for i in range(df.shape[0] // len(tickers)):
-        temp = df.iloc[i * len(tickers):(i + 1) * len(tickers)]
-        date = temp['date'].iloc[0]
-        mvo.loc[date] = temp['close'].values
-
-    mvo.index = pd.to_datetime(mvo.index, utc=True)
-    
     return mvo
 
 
@@ -140,22 +282,102 @@ def calculate_mvo(trade):
  
     
 def StockReturnsComputing(StockPrice, Rows, Columns):
-    StockReturn = np.zeros([Rows - 1, Columns])
-    for j in range(Columns):
-        for i in range(Rows - 1):
-            StockReturn[i, j] = ((StockPrice[i + 1, j] - StockPrice[i, j]) / StockPrice[i, j]) * 100
-            
+    # Percentage returns between consecutive rows, for all tickers at once
+    StockPrice = np.asarray(StockPrice, dtype=float)[:Rows, :Columns]
+    StockReturn = np.diff(StockPrice, axis=0) / StockPrice[:-1] * 100
+
     return StockReturn
 
 
-def calculate_mean_cov(arStockPrices, rows, cols):
+def _ledoit_wolf_shrink(emp_cov, beta_, n_samples):
+    # Shrinkage of ledoit_wolf_cov from the maximum likelihood covariance and beta_, the sum of the squared row sums of X ** 2
+    n_features = emp_cov.shape[-1]
+    emp_cov_trace = np.einsum('...ii->...', emp_cov)
+    mu = emp_cov_trace / n_features
+
+    delta_ = (emp_cov ** 2).sum(axis=(-2, -1))
+    beta = (beta_ / n_samples - delta_) / (n_features * n_samples)
+    delta = (delta_ - 2 * mu * emp_cov_trace + n_features * mu ** 2) / n_features
+    beta = np.minimum(beta, delta)
+    shrinkage = np.divide(beta, delta, out=np.zeros_like(beta), where=delta != 0)
+
+    shrinkage = np.asarray(shrinkage)[..., None, None]
+    return (1 - shrinkage) * emp_cov + shrinkage * np.asarray(mu)[..., None, None] * np.eye(n_features)
+
+
+def ledoit_wolf_cov(returns):
+    """
+    Ledoit-Wolf shrinkage of the covariance towards a scaled identity, for one (T, N) or a batch of (B, T, N) return matrices.
+    Same estimator as sklearn.covariance.ledoit_wolf (maximum likelihood covariance, divided by T).
+
+    Args:
+        returns (numpy array): Returns with time on the second to last axis and tickers on the last axis
+
+    Returns:
+        numpy array: (N, N) or (B, N, N) shrunk covariance matrices
+    """
+    X = returns - returns.mean(axis=-2, keepdims=True)
+    n_samples = X.shape[-2]
+
+    emp_cov = np.swapaxes(X, -1, -2) @ X / n_samples
+    # Sum of all entries of X2.T @ X2 with X2 = X ** 2, which is the sum of the squared row sums of X2
+    beta_ = ((X ** 2).sum(axis=-1) ** 2).sum(axis=-1)
+
+    return _ledoit_wolf_shrink(emp_cov, beta_, n_samples)
+
+
+def calculate_mean_cov(arStockPrices, rows, cols, shrinkage=MVO_COV_SHRINKAGE):
     arReturns = StockReturnsComputing(arStockPrices, rows, cols)
     meanReturns = np.mean(arReturns, axis=0).reshape(-1)
-    covReturns = np.cov(arReturns, rowvar=False) + np.eye(cols) * 1e-6
+    if shrinkage == "ledoit_wolf":
+        covReturns = ledoit_wolf_cov(arReturns) + np.eye(cols) * 1e-6
+    else:
+        covReturns = np.cov(arReturns, rowvar=False) + np.eye(cols) * 1e-6
 
     return meanReturns, covReturns
 
 
+def rolling_mean_cov(arReturns, window, step=1, shrinkage=MVO_COV_SHRINKAGE):
+    """
+    Mean returns and covariance matrices over a rolling window, for time-varying MVO weights.
+    All windows are computed at once from a strided view and cumulative sums of the returns, without a Python loop over time.
+
+    Args:
+        arReturns (numpy array): (T, N) returns from StockReturnsComputing
+        window (int): Number of returns per window
+        step (int): Distance between the ends of two consecutive windows, e.g. 7 for one estimate per trading day
+        shrinkage (str): None for the sample covariance or "ledoit_wolf"
+
+    Returns:
+        meanReturns (numpy array): (W, N) mean returns of the windows
+        covReturns (numpy array): (W, N, N) covariance matrices of the windows
+    """
+    rows, cols = arReturns.shape
+    ends = np.arange(window, rows + 1, step)
+
+    # (W, N, window) view of the windows ending at rows window, window+step, ... Every window is a transposed slice of
+    # arReturns, which the batched matmul hands to BLAS as it is, so the windows are never copied or centered one by one
+    windows = sliding_window_view(arReturns, window, axis=0)[::step]
+    cumulative = np.zeros((rows + 1, cols))
+    np.cumsum(arReturns, axis=0, out=cumulative[1:])
+    sums = cumulative[ends] - cumulative[ends - window]
+    meanReturns = sums / window
+
+    # Centered cross products of each window: X.T @ X - window * mean.T @ mean
+    scatter = windows @ np.swapaxes(windows, -1, -2) - sums[:, :, None] * meanReturns[:, None, :]
+
+    if shrinkage == "ledoit_wolf":
+        # Squared norm of every centered row: |x|^2 - 2 x.mean + |mean|^2
+        squares = sliding_window_view((arReturns ** 2).sum(axis=1), window)[::step]
+        cross = (np.swapaxes(windows, -1, -2) @ meanReturns[:, :, None])[..., 0]
+        centered_squares = squares - 2 * cross + (meanReturns ** 2).sum(axis=1)[:, None]
+        covReturns = _ledoit_wolf_shrink(scatter / window, (centered_squares ** 2).sum(axis=-1), window)
+    else:
+        covReturns = scatter / (window - 1)
+
+    return meanReturns, covReturns + np.eye(cols) * 1e-6
+
+
 def calculate_efficient_frontier(meanReturns, covReturns, trade, StockData):
     stock_dimension = len(trade.tic.unique())
     ef = EfficientFrontier(meanReturns, covReturns, weight_bounds=(0, 1))
@@ -167,16 +389,14 @@ def calculate_efficient_frontier(meanReturns, covReturns, trade, StockData):
     LastPrice = np.array([1/p for p in StockData.tail(1).to_numpy()[0]])
     Initial_Portfolio = np.multiply(mvo_weights, LastPrice)
 
-    TradeData = process_df_for_mvo(trade)
-    TradeData.to_numpy()
-
-    Portfolio_Assets = TradeData @ Initial_Portfolio
+    # StockData is the price matrix of trade from calculate_mvo, reused instead of reshaping trade again
+    Portfolio_Assets = StockData @ Initial_Portfolio
     MVO_result = pd.DataFrame(Portfolio_Assets, columns=["Mean Var"])
 
     return MVO_result
 
 
-def get_djia_index(trade):
+def get_djia_index(trade, offline=BAR_STORE_OFFLINE):
     TRADE_START_DATE = trade["date"].iloc[0]
     TRADE_END_DATE = trade["date"].iloc[-1]
 
@@ -186,12 +406,13 @@ def get_djia_index(trade):
     trade_start_date = TRADE_START_DATE.strftime("%Y-%m-%d")
     trade_end_date = TRADE_END_DATE.strftime("%Y-%m-%d")
 
-    # Download DJIA hourly data between TRADE_START_DATE and TRADE_END_DATE
-    df_dji = yf.download(
-        tickers="^DJI",  # DJIA Index ticker
-        start=trade_start_date,
-        end=trade_end_date,
+    # Download DJIA hourly data between TRADE_START_DATE and TRADE_END_DATE (missing hours only, the rest comes from the bar store)
+    df_dji = get_bars(
+        "^DJI",  # DJIA Index ticker
+        trade_start_date,
+        trade_end_date,
         interval="1h",
+        offline=offline,
     )
 
     # Reset index and rename columns to match desired format
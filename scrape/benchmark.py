@@ -0,0 +1,271 @@
+import argparse
+import glob
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import feedparser
+import requests
+from fetcher import Fetcher
+from http_cache import HttpCache
+from extractor import ArticleExtractor
+
+# --------------------------------------------------------------------------------------
+# Benchmarks of the fetch engine against a local stub HTTP server:
+#  - fetch: wall-clock comparison of the old serial article fetching (sleep, then a plain
+#    requests.get per article) with the concurrent Fetcher. Every 127.0.0.x address
+#    counts as a separate domain for the rate limits.
+#  - cache: bytes and time of a second run revalidated with conditional GETs (304s).
+#  - extract: parse time and memory per page of the article extractor backends on saved
+#    HTML pages (the bodies in http_cache/ or any folder of .html files).
+#
+#   python benchmark.py fetch --articles 24 --domains 4 --latency 0.3
+#   python benchmark.py cache --articles 24
+# --------------------------------------------------------------------------------------
+
+ARTICLE_HTML = b"<html><body><div class='article-body'><p>Nvidia stock news.</p></div></body></html>" * 200
+ETAG = '"v1"'
+LAST_MODIFIED = "Mon, 02 Jun 2025 08:00:00 GMT"
+
+
+def start_stub_server(latency, flaky_every):
+    """
+    Serve a fixed article page (and an RSS feed at /feed) on a free port after `latency` seconds.
+    Requests with a matching If-None-Match get a body-less 304. With flaky_every > 0, the first
+    request of every flaky_every-th article gets a 503 to exercise the retries.
+    The bytes of all sent bodies are counted in server.bytes_sent.
+    """
+    failed_once = set()
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            if self.path == "/feed":
+                body, article_id = feed_xml(self.server.server_address[1]), None
+            else:
+                body, article_id = ARTICLE_HTML, int(self.path.rsplit("/", 1)[-1])
+            with lock:
+                fail = flaky_every and article_id is not None and article_id % flaky_every == 0 \
+                    and article_id not in failed_once
+                failed_once.add(article_id)
+
+            if fail:
+                status, body = 503, b""
+            elif self.headers.get("If-None-Match") == ETAG:
+                status, body = 304, b""
+            else:
+                status = 200
+            self.send_response(status)
+            self.send_header("Content-Type", "application/rss+xml" if self.path == "/feed" else "text/html")
+            self.send_header("ETag", ETAG)
+            self.send_header("Last-Modified", LAST_MODIFIED)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            with lock:
+                server.bytes_sent += len(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", 0), Handler)
+    server.bytes_sent = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def feed_xml(port, articles=24):
+    items = "".join(f"<item><title>Nvidia {i}</title><link>http://127.0.0.1:{port}/article/{i}</link></item>"
+                    for i in range(articles))
+    return f"<?xml version='1.0'?><rss version='2.0'><channel><title>Stub</title>{items}</channel></rss>".encode()
+
+
+def fetch_serial(urls, interval):
+    # Behaviour before the fetch engine: a global sleep before every request, no session
+    pages = []
+    for url in urls:
+        time.sleep(interval)
+        pages.append(requests.get(url, timeout=15).content)
+    return pages
+
+
+def fetch_concurrent(urls, interval, max_workers):
+    fetcher = Fetcher(max_workers=max_workers, domain_interval=interval, backoff=0.1)
+    pages = fetcher.map(lambda url: fetcher.get(url).content, urls)
+    fetcher.close()
+    return pages
+
+
+def benchmark_fetch(articles, domains, latency, interval, max_workers, flaky_every):
+    server = start_stub_server(latency, flaky_every)
+    port = server.server_address[1]
+    urls = [f"http://127.0.0.{i % domains + 1}:{port}/article/{i}" for i in range(articles)]
+
+    timings = {}
+    for name, fetch in [("serial", lambda: fetch_serial(urls, interval)),
+                        ("concurrent", lambda: fetch_concurrent(urls, interval, max_workers))]:
+        start_time = time.perf_counter()
+        pages = fetch()
+        timings[name] = time.perf_counter() - start_time
+        ok = sum(page == ARTICLE_HTML for page in pages)
+        print(f"{name:>10}: {timings[name]:.2f}s, {ok}/{articles} articles fetched")
+
+    server.shutdown()
+    print(f"Speedup: {timings['serial'] / timings['concurrent']:.1f}x "
+          f"({articles} articles, {domains} domains, {latency}s latency, {interval}s per-domain interval)")
+    return timings
+
+
+def benchmark_cache(articles, latency):
+    """
+    Fetch the stub feed and its articles twice through the HTTP cache. The TTL is 0, so the second run
+    revalidates every article with a conditional GET, and the server answers 304 to all of them.
+    """
+    server = start_stub_server(latency, flaky_every=0)
+    port = server.server_address[1]
+    urls = [f"http://127.0.0.1:{port}/article/{i}" for i in range(articles)]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        feed_state = {}
+        for run in ("first run", "second run"):
+            fetcher = Fetcher(domain_interval=0, cache=HttpCache(cache_dir, ttl=0, max_bytes=50 * 1024 ** 2))
+            bytes_before, start_time = server.bytes_sent, time.perf_counter()
+
+            feed = feedparser.parse(f"http://127.0.0.1:{port}/feed", **feed_state)
+            feed_state = {"etag": feed.get("etag"), "modified": feed.get("modified")}
+            pages = fetcher.map(fetcher.fetch_content, urls)
+
+            seconds = time.perf_counter() - start_time
+            stats = fetcher.cache.stats
+            print(f"{run:>10}: {seconds:.2f}s, {server.bytes_sent - bytes_before} bytes sent, "
+                  f"feed status {feed.get('status')} with {len(feed.entries)} entries parsed, "
+                  f"{stats['downloaded']} downloaded, {stats['not_modified']} not modified, "
+                  f"{sum(page == ARTICLE_HTML for page in pages)}/{articles} pages correct")
+            fetcher.close()
+
+    server.shutdown()
+
+
+# Classes of scrape_script.RSS_CLASS_MAP / NEWSAPI_ARTICLE_CLASSES, repeated here so the benchmark
+# does not need the API clients imported by scrape_script
+EXTRACT_CLASSES = ['body yf-1ir6o1g', 'article-body', 'comp article-body mntl-block', 'jupiter22-c-article-body',
+                   'b6Cr_ article-body-container', 'entry', 'Story_body__ZYOg0 userContent', 'zox-post-body-wrap', 'sp_txt']
+
+
+def synthetic_pages(count, seed=0):
+    """
+    News-like pages of a few hundred KB: scripts, styles, navigation and nested layout divs around the article div.
+    """
+    rng = random.Random(seed)
+    words = "nvidia stock shares market chips ai revenue quarter guidance data center investors analysts".split()
+    pages = []
+    for i in range(count):
+        sentence = lambda: " ".join(rng.choice(words) for _ in range(rng.randint(8, 25))).capitalize() + "."
+        head = "".join(f"<script>var config{j} = {{'id': {j}, 'text': '{sentence()}'}};</script>" for j in range(40))
+        head += "<style>" + "".join(f".c{j} {{ margin: {j}px; }}" for j in range(300)) + "</style>"
+        nav = "<ul>" + "".join(f"<li><a href='/n/{j}'>{rng.choice(words)}</a></li>" for j in range(200)) + "</ul>"
+        layout = "".join(f"<div class='layout c{j}'><div><span>{sentence()}</span></div></div>" for j in range(300))
+        class_name = EXTRACT_CLASSES[i % len(EXTRACT_CLASSES)]
+        body = "".join(f"<p>{sentence()} <a href='#'>{rng.choice(words)}</a> {sentence()}</p>" for _ in range(40))
+        pages.append((f"<html><head><meta charset='utf-8'>{head}</head><body><nav>{nav}</nav>{layout}"
+                       f"<div class='{class_name}'>{body}<!-- ad --><script>track()</script></div>"
+                       f"<footer>{layout}</footer></body></html>").encode("utf-8"))
+    return pages
+
+
+def load_pages(fixtures, count):
+    paths = sorted(glob.glob(os.path.join(fixtures, "*.body")) + glob.glob(os.path.join(fixtures, "*.html")))
+    if not paths:
+        print(f"No saved pages in {fixtures}, using {count} synthetic pages")
+        return synthetic_pages(count)
+    pages = []
+    for path in paths[:count]:
+        with open(path, "rb") as f:
+            pages.append(f.read())
+    print(f"Using {len(pages)} saved pages from {fixtures}")
+    return pages
+
+
+def _extract_all(backend, pages, queue):
+    """
+    Extract every page with one backend in a fresh process, so peak RSS is not shared between backends.
+    """
+    extractor = ArticleExtractor(backend, class_names=EXTRACT_CLASSES)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    texts, seconds, heap_peaks = [], [], []
+    for html in pages:
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        article = extractor.find_article(html, EXTRACT_CLASSES)
+        texts.append((extractor.paragraphs_text(article), extractor.full_text(article)) if article is not None else None)
+        seconds.append(time.perf_counter() - start_time)
+        heap_peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    # Parse again without tracemalloc for the timing, tracemalloc slows down Python allocations
+    start_time = time.perf_counter()
+    for html in pages:
+        extractor.find_article(html, EXTRACT_CLASSES)
+    parse_seconds = time.perf_counter() - start_time
+    queue.put({
+        "texts": texts,
+        "ms_per_page": 1000 * parse_seconds / len(pages),
+        "heap_kb_per_page": sum(heap_peaks) / len(heap_peaks) / 1024,
+        "rss_growth_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss) / 1024,
+    })
+
+
+def benchmark_extract(fixtures, count):
+    pages = load_pages(fixtures, count)
+    print(f"Average page size: {sum(map(len, pages)) / len(pages) / 1024:.0f} KB")
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for backend in ("bs4", "lxml"):
+        queue = context.Queue()
+        process = context.Process(target=_extract_all, args=(backend, pages, queue))
+        process.start()
+        results[backend] = queue.get()
+        process.join()
+        r = results[backend]
+        print(f"{backend:>5}: {r['ms_per_page']:.1f} ms/page, Python heap peak {r['heap_kb_per_page']:.0f} KB/page, "
+              f"peak RSS growth {r['rss_growth_mb']:.1f} MB")
+
+    same = sum(a == b for a, b in zip(results["bs4"]["texts"], results["lxml"]["texts"]))
+    print(f"Speedup: {results['bs4']['ms_per_page'] / results['lxml']['ms_per_page']:.1f}x, "
+          f"identical text on {same}/{len(pages)} pages")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the scraper")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fetch_parser = subparsers.add_parser("fetch", help="serial vs concurrent article fetching on a stub server")
+    fetch_parser.add_argument("--articles", type=int, default=24)
+    fetch_parser.add_argument("--domains", type=int, default=4)
+    fetch_parser.add_argument("--latency", type=float, default=0.3, help="seconds the stub server takes per request")
+    fetch_parser.add_argument("--interval", type=float, default=2.0, help="per-domain interval (and old global sleep)")
+    fetch_parser.add_argument("--max-workers", type=int, default=8)
+    fetch_parser.add_argument("--flaky-every", type=int, default=5, help="fail every n-th article once with a 503, 0 disables")
+
+    cache_parser = subparsers.add_parser("cache", help="conditional GETs of the feed and articles against a stub server")
+    cache_parser.add_argument("--articles", type=int, default=24)
+    cache_parser.add_argument("--latency", type=float, default=0.05)
+
+    extract_parser = subparsers.add_parser("extract", help="parse time and memory of the article extractor backends")
+    extract_parser.add_argument("--fixtures", default="http_cache", help="folder with saved pages (.body or .html)")
+    extract_parser.add_argument("--pages", type=int, default=30)
+
+    args = parser.parse_args()
+    if args.command == "fetch":
+        benchmark_fetch(args.articles, args.domains, args.latency, args.interval, args.max_workers, args.flaky_every)
+    elif args.command == "cache":
+        benchmark_cache(args.articles, args.latency)
+    elif args.command == "extract":
+        benchmark_extract(args.fixtures, args.pages)
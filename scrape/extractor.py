@@ -0,0 +1,115 @@
+import threading
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+    import lxml.html
+except ImportError:  # lxml is optional, the "bs4" backend works without it
+    etree = None
+
+# --------------------------------------------------------------------------------------
+# Extraction of the article body from a downloaded page. The "lxml" backend parses with
+# libxml2 and finds the target div with XPath expressions that are compiled once per class
+# name; the "bs4" backend is the original BeautifulSoup html.parser path. Both follow the
+# BeautifulSoup class_ semantics: a single class name matches any div having that class,
+# a name with spaces has to match the div's whole class attribute.
+# --------------------------------------------------------------------------------------
+
+# Text of script/style elements is left out, like BeautifulSoup's get_text does
+_TEXT_XPATH = ".//text()[not(ancestor::script or ancestor::style or ancestor::template)]"
+
+
+def _class_xpath(class_name):
+    if " " in class_name.strip():
+        return f"(//div[normalize-space(@class) = '{' '.join(class_name.split())}'])[1]"
+    return f"(//div[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')])[1]"
+
+
+class ArticleExtractor:
+    """
+    Finds the first div with one of the given classes in a page and returns its text.
+
+    Args:
+        backend (str): "lxml" (falls back to "bs4" when lxml is not installed) or "bs4"
+        class_names (iterable): Class names to compile selectors for up front, others are compiled on first use
+    """
+
+    def __init__(self, backend="lxml", class_names=()):
+        self.backend = backend if etree is not None else "bs4"
+        self.class_names = list(class_names)
+        # Compiled XPath objects are not shared between the fetch threads, each thread compiles its own once
+        self.local = threading.local()
+
+    def _selectors(self):
+        if not hasattr(self.local, "selectors"):
+            self.local.text_xpath = etree.XPath(_TEXT_XPATH)
+            self.local.selectors = {name: etree.XPath(_class_xpath(name)) for name in self.class_names}
+        return self.local.selectors
+
+    def _selector(self, class_name):
+        selectors = self._selectors()
+        if class_name not in selectors:
+            selectors[class_name] = etree.XPath(_class_xpath(class_name))
+        return selectors[class_name]
+
+    def _parse(self, html):
+        # Pages without a declared charset are read as UTF-8 when they decode as UTF-8, like BeautifulSoup does
+        try:
+            html.decode("utf-8")
+            parser = lxml.html.HTMLParser(encoding="utf-8")
+        except UnicodeDecodeError:
+            parser = lxml.html.HTMLParser()
+        return etree.fromstring(html, parser)
+
+    def _text(self, element, strip):
+        self._selectors()
+        strings = self.local.text_xpath(element)
+        if strip:
+            return "".join(s.strip() for s in strings)
+        return "".join(strings)
+
+    def find_article(self, html, class_names):
+        """
+        Parse a page and return the first div matching the class names, tried in the given order.
+
+        Args:
+            html (bytes): Page content
+            class_names (list): Class names to try
+
+        Returns:
+            Element of the backend (lxml element or bs4 Tag), or None if no div matches
+        """
+        if self.backend == "bs4":
+            soup = BeautifulSoup(html, "html.parser")
+            for class_name in class_names:
+                article = soup.find("div", class_=class_name)
+                if article:
+                    return article
+            return None
+
+        if not html or not html.strip():
+            return None
+        root = self._parse(html)
+        if root is None:
+            return None
+        for class_name in class_names:
+            found = self._selector(class_name)(root)
+            if found:
+                return found[0]
+        return None
+
+    def paragraphs_text(self, article):
+        """
+        Stripped text of every <p> of the article joined by line breaks, or the stripped text of the whole article.
+        """
+        if self.backend == "bs4":
+            return "\n".join(p.get_text(strip=True) for p in article.find_all("p")) or article.get_text(strip=True)
+        return "\n".join(self._text(p, strip=True) for p in article.iter("p")) or self._text(article, strip=True)
+
+    def full_text(self, article):
+        """
+        Unstripped text of the whole article.
+        """
+        if self.backend == "bs4":
+            return article.get_text()
+        return self._text(article, strip=False)
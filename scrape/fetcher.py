@@ -0,0 +1,138 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# --------------------------------------------------------------------------------------
+# Concurrent fetch engine shared by the scrapers: one requests.Session with a bounded
+# connection pool, a global cap on concurrent requests, a minimum interval between two
+# requests to the same domain, and timeouts plus retries with exponential backoff.
+# --------------------------------------------------------------------------------------
+
+class DomainRateLimiter:
+    """
+    Spaces out requests to the same domain by at least min_interval seconds,
+    requests to different domains are not delayed by each other.
+    """
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        domain = urlparse(url).netloc.lower()
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(domain, now))
+            self.next_slot[domain] = slot + self.min_interval
+        # Sleep outside the lock, so other domains can reserve their slots meanwhile
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Fetcher:
+    """
+    Fetches many URLs concurrently with a shared connection pool.
+
+    Args:
+        max_workers (int): Global cap on requests in flight
+        domain_interval (float): Minimum seconds between two requests to the same domain
+        timeout (float): Connect and read timeout of every request in seconds
+        retries (int): Retries of connection errors and 429/5xx responses
+        backoff (float): Backoff factor, the n-th retry waits backoff * 2 ** (n - 1) seconds
+        cache (HttpCache): Optional on-disk response cache used by fetch_content
+    """
+
+    def __init__(self, max_workers=8, domain_interval=2.0, timeout=15, retries=3, backoff=1.0, cache=None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_limiter = DomainRateLimiter(domain_interval)
+        # Shared by all map calls, so scrapers running in parallel stay within the global cap together
+        self.slots = threading.BoundedSemaphore(max_workers)
+
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("GET", "HEAD"), respect_retry_after_header=True, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url, headers=None):
+        """
+        GET a single URL once its domain's rate limit allows it.
+
+        Args:
+            url (str): URL to fetch
+            headers (dict): Optional request headers
+
+        Returns:
+            requests.Response: Response after any retries
+        """
+        self.rate_limiter.wait(url)
+        with self.slots:
+            return self.session.get(url, headers=headers, timeout=self.timeout)
+
+    def fetch_content(self, url, headers=None):
+        """
+        Body of a URL, served from the cache while it is fresh, otherwise fetched with a conditional
+        GET using the cached ETag/Last-Modified, so an unchanged page comes back as a body-less 304.
+
+        Args:
+            url (str): URL to fetch
+            headers (dict): Optional request headers
+
+        Returns:
+            bytes: Response body
+        """
+        if self.cache is None:
+            return self.get(url, headers=headers).content
+
+        entry = self.cache.lookup(url)
+        if entry and entry["fresh"]:
+            self.cache.count("fresh")
+            self.cache.touch(url, entry)
+            return entry["body"]
+
+        request_headers = dict(headers or {})
+        if entry:
+            request_headers.update(self.cache.validators(entry))
+        response = self.get(url, headers=request_headers)
+
+        if response.status_code == 304 and entry:
+            self.cache.count("not_modified")
+            self.cache.touch(url, entry, revalidated=True)
+            return entry["body"]
+        self.cache.count("downloaded")
+        if response.status_code == 200:
+            self.cache.store(url, response)
+        return response.content
+
+    def map(self, func, items):
+        """
+        Run func over items on up to max_workers threads, func is expected to call self.get.
+
+        Args:
+            func (callable): Function applied to every item
+            items (iterable): Items, e.g. URLs or (URL, extra) tuples
+
+        Returns:
+            list: Results of func in the order of items
+        """
+        items = list(items)
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(func, items))
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            evicted = self.cache.evict()
+            stats = self.cache.stats
+            print(f"HTTP cache: {stats['fresh']} fresh, {stats['not_modified']} not modified (304), "
+                  f"{stats['downloaded']} downloaded, {evicted} evicted")
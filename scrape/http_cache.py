@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# --------------------------------------------------------------------------------------
+# Small on-disk HTTP response cache for article pages. Every entry keeps the body and the
+# ETag/Last-Modified validators of a 200 response. Entries younger than the TTL are served
+# without any request, older ones are revalidated with a conditional GET (a 304 reuses
+# the cached body). Least recently used entries are evicted above max_bytes.
+# --------------------------------------------------------------------------------------
+
+class HttpCache:
+    """
+    On-disk cache of GET responses, one body file and one metadata JSON per URL.
+
+    Args:
+        directory (str): Cache directory
+        ttl (float): Seconds an entry is served without revalidation
+        max_bytes (int): Maximum total size of the cached bodies
+    """
+
+    def __init__(self, directory, ttl, max_bytes):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.stats = {"fresh": 0, "not_modified": 0, "downloaded": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def count(self, outcome):
+        with self.lock:
+            self.stats[outcome] += 1
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + ".json", base + ".body"
+
+    def _write_meta(self, meta_path, meta):
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def lookup(self, url):
+        """
+        Cached entry of a URL.
+
+        Returns:
+            dict: Metadata with 'body' and 'fresh' added, or None if the URL is not cached
+        """
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                meta["body"] = f.read()
+        except (OSError, ValueError):
+            return None
+        meta["fresh"] = time.time() - meta["stored_at"] < self.ttl
+        return meta
+
+    def validators(self, entry):
+        """
+        Conditional request headers for a cached entry.
+        """
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, response):
+        """
+        Cache the body and validators of a 200 response.
+        """
+        meta_path, body_path = self._paths(url)
+        with self.lock:
+            with open(body_path, "wb") as f:
+                f.write(response.content)
+            self._write_meta(meta_path, {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "stored_at": time.time(),
+                "last_used": time.time(),
+                "size": len(response.content),
+            })
+
+    def touch(self, url, entry, revalidated=False):
+        """
+        Mark an entry as used for the eviction order, after a 304 Not Modified also restart its TTL.
+        """
+        meta_path, _ = self._paths(url)
+        meta = {k: v for k, v in entry.items() if k not in ("body", "fresh")}
+        meta["last_used"] = time.time()
+        if revalidated:
+            meta["stored_at"] = meta["last_used"]
+        with self.lock:
+            self._write_meta(meta_path, meta)
+
+    def evict(self):
+        """
+        Delete the least recently used entries until the cached bodies fit in max_bytes.
+
+        Returns:
+            int: Number of evicted entries
+        """
+        with self.lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(self.directory, name), "r", encoding="utf-8") as f:
+                        meta = json.load(f)
+                    entries.append((meta["last_used"], meta["size"], name[:-len(".json")]))
+                except (OSError, ValueError, KeyError):
+                    continue
+
+            total = sum(size for _, size, _ in entries)
+            evicted = 0
+            for _, size, key in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                for suffix in (".json", ".body"):
+                    path = os.path.join(self.directory, key + suffix)
+                    if os.path.exists(path):
+                        os.remove(path)
+                total -= size
+                evicted += 1
+            return evicted
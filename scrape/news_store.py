@@ -0,0 +1,106 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# --------------------------------------------------------------------------------------
+# Date-partitioned Parquet copy of news.csv: one file per day of the publication date,
+# news_parquet/date=YYYY-MM-DD/news.parquet, with a fixed schema. Readers only open the
+# days they need and only the columns they need, and texts with semicolons, quotes or
+# line breaks are stored as they are. news.csv is still written for compatibility.
+# --------------------------------------------------------------------------------------
+
+SCHEMA = pa.schema([
+    ("datetime", pa.timestamp("us")),
+    ("header", pa.string()),
+    ("content", pa.string()),
+    ("source", pa.string()),
+    ("specific_source", pa.string()),
+    ("link", pa.string()),
+])
+
+CSV_COLUMNS = {
+    "Date and Timestamp": "datetime",
+    "Title": "header",
+    "Full Text": "content",
+    "Source": "source",
+    "SpecificSource": "specific_source",
+    "Link": "link",
+}
+
+
+def partition_path(root, day):
+    return os.path.join(root, f"date={day}", "news.parquet")
+
+
+def append_news(df, root):
+    """
+    Append scraped rows to the partitions of their publication days.
+
+    Args:
+        df (pandas DataFrame): Rows with the news.csv columns, 'Date and Timestamp' parsed to datetime
+        root (str): Root folder of the partitions
+
+    Returns:
+        None
+    """
+    df = df.rename(columns=CSV_COLUMNS)[SCHEMA.names]
+    for day, rows in df.groupby(df["datetime"].dt.strftime("%Y-%m-%d")):
+        path = partition_path(root, day)
+        table = pa.Table.from_pandas(rows, schema=SCHEMA, preserve_index=False)
+        if os.path.exists(path):
+            table = pa.concat_tables([pq.read_table(path, schema=SCHEMA), table])
+
+        # Write to a temporary file first, so an interruption never leaves a broken partition
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(table, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+
+def parse_timestamps(values):
+    """
+    Parses the 'Date and Timestamp' strings of news.csv: 'YYYY-MM-DD HH:MM:SS' with a fixed format,
+    old rows like '16.3.2025 12:51' day first, anything else per value. Values with a UTC offset become naive UTC,
+    unparsable values become NaT.
+
+    Args:
+        values (pandas Series): Raw 'Date and Timestamp' strings
+
+    Returns:
+        pandas Series: datetime64 timestamps
+    """
+    values = values.astype("string").str.strip()
+    parsed = pd.to_datetime(values, format="%Y-%m-%d %H:%M:%S", errors="coerce")
+
+    dotted = values.str.match(r"^\d{1,2}\.\d{1,2}\.\d{4} \d{1,2}:\d{2}$", na=False)
+    if dotted.any():
+        parsed[dotted] = pd.to_datetime(values[dotted], format="%d.%m.%Y %H:%M", errors="coerce")
+
+    other = parsed.isna() & values.notna() & ~dotted
+    if other.any():
+        parsed[other] = pd.to_datetime(values[other], format="mixed", errors="coerce", utc=True).dt.tz_convert(None)
+
+    return parsed
+
+
+def migrate_csv(csv_path, root):
+    """
+    One-off conversion of an existing news.csv into partitions.
+    Rows whose timestamp cannot be parsed are reported and left out.
+
+    Args:
+        csv_path (str): news.csv
+        root (str): Root folder of the partitions
+
+    Returns:
+        int: Number of migrated rows
+    """
+    df = pd.read_csv(csv_path, delimiter=";", encoding="utf-8", quotechar='"', on_bad_lines="warn", dtype=str)
+    dates = parse_timestamps(df["Date and Timestamp"])
+    unparsed = df.loc[dates.isna(), "Date and Timestamp"]
+    if not unparsed.empty:
+        print(f"{len(unparsed)} rows of {csv_path} not migrated, unparsable timestamps: {unparsed.head(5).tolist()}")
+    df["Date and Timestamp"] = dates
+    df = df.dropna(subset=["Date and Timestamp"])
+    append_news(df, root)
+    return len(df)
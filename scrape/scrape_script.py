@@ -3,16 +3,21 @@ import os
 import json
 import hashlib
 import time
-import requests
 import feedparser
 import pandas as pd
-from bs4 import BeautifulSoup
 from newsapi import NewsApiClient
 import praw
 from datetime import datetime, timedelta
 from urllib.parse import urlparse
 import re
+import threading
 import tldextract
+from concurrent.futures import ThreadPoolExecutor
+from fetcher import Fetcher
+from http_cache import HttpCache
+from seen_store import SeenHashStore
+from extractor import ArticleExtractor
+from news_store import append_news, migrate_csv
 
 # --------------------------------------------------------------------------------------
 REDDIT_CONFIG = {
@@ -26,6 +31,7 @@ SUBREDDITS = ["wallstreetbets", "stocks", "investing", "stockmarket", "finance"]
 QUERIES = ["nvidia", "NVDA"]
 REDDIT_SCORE_MIN = 50
 REDDIT_LOOKBACK_DAYS = 2
+REDDIT_MAX_CONCURRENT_SEARCHES = 5
 
 RSS_URLS = [
     "https://feeds.finance.yahoo.com/rss/2.0/headline?s=NVDA&region=US&lang=en-US",
@@ -35,6 +41,35 @@ REQUEST_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
 
+# Article fetching: global cap on concurrent requests, minimum seconds between two requests
+# to the same domain, request timeout in seconds, and retries with exponential backoff
+MAX_CONCURRENT_FETCHES = 8
+DOMAIN_MIN_INTERVAL = 2.0
+FETCH_TIMEOUT = 15
+FETCH_RETRIES = 3
+FETCH_BACKOFF = 1.0
+
+# Seconds after the start of the run after which a source that has not finished is skipped,
+# so one hung source does not block the whole run
+SOURCE_DEADLINES = {"Reddit": 900, "NewsAPI": 600, "RSS": 600}
+# Seconds a source that missed its deadline gets to finish its requests in flight before the fetcher is closed
+SOURCE_CANCEL_GRACE = FETCH_TIMEOUT * (FETCH_RETRIES + 1) + 30
+
+# Class of the div holding the article body per RSS domain, and the classes tried in order for NewsAPI articles
+RSS_CLASS_MAP = {
+    'yahoo.com': 'body yf-1ir6o1g',
+    'fool.com': 'article-body',
+    'investopedia.com': 'comp article-body mntl-block',
+    'nasdaq.com': 'jupiter22-c-article-body',
+}
+RSS_DEFAULT_CLASS = 'article-body'
+NEWSAPI_ARTICLE_CLASSES = [
+    'b6Cr_ article-body-container', 'entry', 'Story_body__ZYOg0 userContent',
+    'zox-post-body-wrap', 'sp_txt', 'article-body'
+]
+# "lxml" (fast, selectors compiled once) or "bs4" (BeautifulSoup html.parser)
+EXTRACTOR_BACKEND = "lxml"
+
 NEWSAPI_KEY = os.getenv("NEWSAPI_KEY")
 NEWS_DOMAINS = 'fool.com,etfdailynews.com,marketplace.org,forbes.com,denverpost.com,bostonherald.com,globenewswire.com,ndtv.com,nbcnews.com'
 
@@ -44,7 +79,20 @@ FROM_DATE = two_days_ago.strftime('%Y-%m-%dT00:00:00')
 TO_DATE = today.strftime('%Y-%m-%dT23:59:59')
 
 COMBINED_OUTPUT_FILE = "news.csv"
-SEEN_HASH_FILE = "seen_hashes.json"
+# Date-partitioned Parquet copy of news.csv, read by the sentiment pipeline
+NEWS_PARQUET_DIR = "news_parquet"
+SEEN_HASH_FILE = "seen_hashes.bin"
+LEGACY_SEEN_HASH_FILE = "seen_hashes.json"
+# Hashes of items that did not show up in any source for this many days are dropped,
+# far beyond the lookback of the sources (REDDIT_LOOKBACK_DAYS, FROM_DATE)
+SEEN_HASH_MAX_AGE_DAYS = 30
+
+# On-disk cache of article pages (kept between runs by the workflow's cache step): entries younger than
+# HTTP_CACHE_TTL seconds are reused without a request, older ones are revalidated with a conditional GET
+HTTP_CACHE_DIR = "http_cache"
+HTTP_CACHE_TTL = 12 * 3600
+HTTP_CACHE_MAX_MB = 200
+FEED_STATE_FILE = os.path.join(HTTP_CACHE_DIR, "feeds.json")
 
 # --------------------------------------------------------------------------------------
 
@@ -52,14 +100,24 @@ def compute_hash(title, link):
     return hashlib.md5(f"{title}{link}".encode('utf-8')).hexdigest()
 
 def load_seen_hashes():
-    if os.path.exists(SEEN_HASH_FILE):
-        with open(SEEN_HASH_FILE, 'r', encoding='utf-8') as f:
-            return set(json.load(f))
-    return set()
+    return SeenHashStore(SEEN_HASH_FILE, SEEN_HASH_MAX_AGE_DAYS, legacy_json=LEGACY_SEEN_HASH_FILE)
 
 def save_seen_hashes(hashes):
-    with open(SEEN_HASH_FILE, 'w', encoding='utf-8') as f:
-        json.dump(list(hashes), f, indent=2)
+    expired = hashes.save()
+    print(f"Seen hashes: {len(hashes)} kept, {expired} expired")
+    if os.path.exists(LEGACY_SEEN_HASH_FILE):
+        os.remove(LEGACY_SEEN_HASH_FILE)
+
+def load_feed_state():
+    if os.path.exists(FEED_STATE_FILE):
+        with open(FEED_STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def save_feed_state(feed_state):
+    os.makedirs(os.path.dirname(FEED_STATE_FILE), exist_ok=True)
+    with open(FEED_STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(feed_state, f, indent=2)
 
 def contains_relevant_keywords(title, content):
     relevant_keywords = ['nvidia', 'nvda', 'stock']
@@ -90,48 +148,80 @@ def preprocess_new_entries(df):
 
 # --------------------------------------------------------------------------------------
 
-def scrape_reddit():
-    reddit = praw.Reddit(**REDDIT_CONFIG)
+def scrape_reddit(cancel):
     min_time = datetime.utcnow() - timedelta(days=REDDIT_LOOKBACK_DAYS)
     min_timestamp = min_time.timestamp()
     results = []
 
-    for sub in SUBREDDITS:
-        for query in QUERIES:
-            for post in reddit.subreddit(sub).search(query, sort="new"):
-                if post.created_utc < min_timestamp or post.score < REDDIT_SCORE_MIN:
-                    continue
-                if not post.selftext.strip():
-                    continue
-
-                dt = datetime.utcfromtimestamp(post.created_utc)
-                results.append({
-                    "Date and Timestamp": dt.strftime('%Y-%m-%d %H:%M:%S'),
-                    "Title": post.title,
-                    "Full Text": post.selftext.strip(),
-                    "Source": "Reddit",
-                    "Link": f"https://reddit.com{post.permalink}"
-                })
+    def search(sub, query):
+        # PRAW is not thread safe, every search gets its own client
+        reddit = praw.Reddit(**REDDIT_CONFIG)
+        posts = []
+        if cancel.is_set():
+            return posts
+        for post in reddit.subreddit(sub).search(query, sort="new"):
+            if cancel.is_set():
+                break
+            if post.created_utc < min_timestamp or post.score < REDDIT_SCORE_MIN:
+                continue
+            if not post.selftext.strip():
+                continue
+
+            dt = datetime.utcfromtimestamp(post.created_utc)
+            posts.append({
+                "Date and Timestamp": dt.strftime('%Y-%m-%d %H:%M:%S'),
+                "Title": post.title,
+                "Full Text": post.selftext.strip(),
+                "Source": "Reddit",
+                "Link": f"https://reddit.com{post.permalink}"
+            })
+        return posts
+
+    # Search all subreddit/query pairs concurrently, results keep the subreddit/query order
+    searches = [(sub, query) for sub in SUBREDDITS for query in QUERIES]
+    with ThreadPoolExecutor(max_workers=REDDIT_MAX_CONCURRENT_SEARCHES) as executor:
+        for posts in executor.map(lambda s: search(*s), searches):
+            results.extend(posts)
     print("Reddit done")
     return results
 
-def scrape_rss():
+extractor = ArticleExtractor(EXTRACTOR_BACKEND,
+                             class_names=[*RSS_CLASS_MAP.values(), RSS_DEFAULT_CLASS, *NEWSAPI_ARTICLE_CLASSES])
+
+def make_fetcher():
+    cache = HttpCache(HTTP_CACHE_DIR, ttl=HTTP_CACHE_TTL, max_bytes=HTTP_CACHE_MAX_MB * 1024 * 1024)
+    return Fetcher(max_workers=MAX_CONCURRENT_FETCHES, domain_interval=DOMAIN_MIN_INTERVAL,
+                   timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES, backoff=FETCH_BACKOFF, cache=cache)
+
+def scrape_rss(fetcher, seen_hashes, feed_state, cancel):
     results = []
 
     def get_full_content(url, target_class):
-        time.sleep(2)
+        # A cancelled run skips the articles it has not fetched yet
+        if cancel.is_set():
+            return "Cancelled"
         try:
-            r = requests.get(url, headers=REQUEST_HEADERS, timeout=15)
-            soup = BeautifulSoup(r.content, 'html.parser')
-            article = soup.find('div', class_=target_class)
-            if article:
-                return '\n'.join(p.get_text(strip=True) for p in article.find_all('p')) or article.get_text(strip=True)
+            article = extractor.find_article(fetcher.fetch_content(url, headers=REQUEST_HEADERS), [target_class])
+            if article is not None:
+                return extractor.paragraphs_text(article)
             return "Article body not found"
         except Exception as e:
             return f"Error: {str(e)}"
 
+    entries = []
+    updated_state = {}
     for feed_url in RSS_URLS:
-        feed = feedparser.parse(feed_url)
+        if cancel.is_set():
+            break
+        # Conditional request with the ETag/Last-Modified of the last run, an unchanged feed answers 304
+        state = feed_state.get(feed_url, {})
+        feed = feedparser.parse(feed_url, etag=state.get('etag'), modified=state.get('modified'))
+        if feed.get('status') == 304:
+            print(f"RSS Feed: {feed_url} not modified since the last run, skipped")
+            continue
+        if feed.get('status') == 200:
+            updated_state[feed_url] = {'etag': feed.get('etag'), 'modified': feed.get('modified')}
+
         for entry in feed.entries:
             link = entry.get('link')
             title = entry.get('title', 'N/A')
@@ -139,43 +229,44 @@ def scrape_rss():
                      if entry.get('published_parsed') else datetime.utcnow()
             timestamp = pub_dt.strftime('%Y-%m-%d %H:%M:%S')
 
-            class_map = {
-                'yahoo.com': 'body yf-1ir6o1g',
-                'fool.com': 'article-body',
-                'investopedia.com': 'comp article-body mntl-block',
-                'nasdaq.com': 'jupiter22-c-article-body',
-            }
-            target_class = next((v for k, v in class_map.items() if k in link), 'article-body')
-
-            content = get_full_content(link, target_class)
-
-            if contains_relevant_keywords(title, content):
-                results.append({
-                    "Date and Timestamp": timestamp,
-                    "Title": title,
-                    "Full Text": content.replace('\n', ' '),
-                    "Source": "News",
-                    "Link": link
-                })
+            target_class = next((v for k, v in RSS_CLASS_MAP.items() if k in link), RSS_DEFAULT_CLASS)
+            entries.append((timestamp, title, link, target_class))
+
+    # Only fetch articles that were not seen in earlier runs
+    total = len(entries)
+    entries = [e for e in entries if compute_hash(e[1], e[2]) not in seen_hashes]
+    print(f"RSS Feed: {total - len(entries)} of {total} articles already seen and not fetched")
+
+    # Fetch all articles concurrently, results keep the feed order
+    contents = fetcher.map(lambda e: get_full_content(e[2], e[3]), entries)
+
+    for (timestamp, title, link, _), content in zip(entries, contents):
+        if contains_relevant_keywords(title, content):
+            results.append({
+                "Date and Timestamp": timestamp,
+                "Title": title,
+                "Full Text": content.replace('\n', ' '),
+                "Source": "News",
+                "Link": link
+            })
+    # Only remember the feed validators once all entries were processed, a cancelled run fetches them again next time
+    if not cancel.is_set():
+        feed_state.update(updated_state)
     print("RSS Feed done")
     return results
 
-def scrape_newsapi():
+def scrape_newsapi(fetcher, seen_hashes, cancel):
     client = NewsApiClient(api_key=NEWSAPI_KEY)
     results = []
 
     def fetch_full_article(url):
+        # A cancelled run skips the articles it has not fetched yet
+        if cancel.is_set():
+            return "Cancelled"
         try:
-            r = requests.get(url)
-            soup = BeautifulSoup(r.content, 'html.parser')
-            possible_classes = [
-                'b6Cr_ article-body-container', 'entry', 'Story_body__ZYOg0 userContent',
-                'zox-post-body-wrap', 'sp_txt', 'article-body'
-            ]
-            for class_name in possible_classes:
-                article = soup.find('div', class_=class_name)
-                if article:
-                    return article.get_text().replace('\n', ' ')
+            article = extractor.find_article(fetcher.fetch_content(url), NEWSAPI_ARTICLE_CLASSES)
+            if article is not None:
+                return extractor.full_text(article).replace('\n', ' ')
             return "Full article text not available."
         except Exception as e:
             return f"Error: {str(e)}"
@@ -190,11 +281,18 @@ def scrape_newsapi():
         to=TO_DATE,
         domains=NEWS_DOMAINS
     )['articles']
-    
-    for article in articles:
+
+    # Only fetch articles that were not seen in earlier runs
+    total = len(articles)
+    articles = [a for a in articles if compute_hash(a['title'], a['url']) not in seen_hashes]
+    print(f"NewsAPI: {total - len(articles)} of {total} articles already seen and not fetched")
+
+    # Fetch all articles concurrently, results keep the API order
+    contents = fetcher.map(lambda a: fetch_full_article(a['url']), articles)
+
+    for article, content in zip(articles, contents):
         dt = datetime.strptime(article['publishedAt'], '%Y-%m-%dT%H:%M:%SZ')
         timestamp = dt.strftime('%Y-%m-%d %H:%M:%S')
-        content = fetch_full_article(article['url'])
 
         if contains_relevant_keywords(article['title'], content):
             results.append({
@@ -209,17 +307,71 @@ def scrape_newsapi():
 
 # --------------------------------------------------------------------------------------
 
+def run_scrapers(scrapers):
+    """
+    Runs the scrapers in parallel, each on its own thread, and merges their results in the given order.
+    Every scraper is called with a threading.Event that is set when it misses its SOURCE_DEADLINES deadline,
+    it then skips its remaining work. A scraper that fails or is cancelled is reported and skipped.
+    Cancelled scrapers are waited for up to SOURCE_CANCEL_GRACE seconds, so the shared fetcher can be closed after
+    this returns. The threads are daemon threads, so a hung scraper does not keep the job alive after main() is done.
+    """
+    results, timings, threads = {}, {}, {}
+    cancels = {name: threading.Event() for name, _ in scrapers}
+    start = time.monotonic()
+
+    def run(name, scraper):
+        scraper_start = time.monotonic()
+        try:
+            results[name] = scraper(cancels[name])
+            status = "ok"
+        except Exception as e:
+            status = f"failed -> {e}"
+        timings[name] = (time.monotonic() - scraper_start, status)
+
+    for name, scraper in scrapers:
+        threads[name] = threading.Thread(target=run, args=(name, scraper), name=f"scrape-{name}", daemon=True)
+        threads[name].start()
+
+    merged = []
+    print("Per-source timing:")
+    for name, _ in scrapers:
+        threads[name].join(max(0, start + SOURCE_DEADLINES[name] - time.monotonic()))
+        if threads[name].is_alive():
+            cancels[name].set()
+            print(f"  {name}: timed out after {SOURCE_DEADLINES[name]}s, cancelled and skipped")
+            continue
+        seconds, status = timings[name]
+        items = results.get(name, [])
+        print(f"  {name}: {len(items)} items in {seconds:.1f}s ({status})")
+        merged.extend(items)
+    print(f"All sources done in {time.monotonic() - start:.1f}s")
+
+    for name, _ in scrapers:
+        if cancels[name].is_set():
+            threads[name].join(SOURCE_CANCEL_GRACE)
+            if threads[name].is_alive():
+                print(f"{name}: still running {SOURCE_CANCEL_GRACE}s after it was cancelled")
+    return merged
+
 def main():
     all_data = []
     seen_hashes = load_seen_hashes()
-
-    for scraper in [scrape_reddit, scrape_newsapi, scrape_rss]:
-        data = scraper()
-        for item in data:
-            item_hash = compute_hash(item['Title'], item['Link'])
-            if item_hash not in seen_hashes:
-                all_data.append(item)
-                seen_hashes.add(item_hash)
+    feed_state = load_feed_state()
+    fetcher = make_fetcher()
+
+    data = run_scrapers([
+        ("Reddit", scrape_reddit),
+        ("NewsAPI", lambda cancel: scrape_newsapi(fetcher, seen_hashes, cancel)),
+        ("RSS", lambda cancel: scrape_rss(fetcher, seen_hashes, feed_state, cancel)),
+    ])
+
+    # The scrapers only read seen_hashes, new hashes are added here after all of them are done.
+    # Dedup after merging, in the fixed source order, so the result does not depend on which source finished first
+    for item in data:
+        item_hash = compute_hash(item['Title'], item['Link'])
+        if item_hash not in seen_hashes:
+            all_data.append(item)
+            seen_hashes.add(item_hash)
 
     if all_data:
         new_data_df = pd.DataFrame(all_data)
@@ -231,12 +383,21 @@ def main():
         new_data_df = new_data_df.sort_values(by='Date and Timestamp', ascending=True)
         new_data_df = new_data_df.drop_duplicates(subset='Title', keep='first')
 
+        # Convert the existing news.csv once, before the new rows are appended to it
+        if not os.path.isdir(NEWS_PARQUET_DIR) and os.path.exists(COMBINED_OUTPUT_FILE):
+            migrated = migrate_csv(COMBINED_OUTPUT_FILE, NEWS_PARQUET_DIR)
+            print(f"Migrated {migrated} rows of {COMBINED_OUTPUT_FILE} to {NEWS_PARQUET_DIR}")
+        append_news(new_data_df, NEWS_PARQUET_DIR)
+
         if os.path.exists(COMBINED_OUTPUT_FILE):
             new_data_df.to_csv(COMBINED_OUTPUT_FILE, mode='a', header=False, index=False, sep=';', quoting=csv.QUOTE_ALL)
         else:
             new_data_df.to_csv(COMBINED_OUTPUT_FILE, index=False, sep=';', quoting=csv.QUOTE_ALL)
 
-        save_seen_hashes(seen_hashes)
+    # Saved on every run, so the days of items that were seen again are refreshed
+    save_seen_hashes(seen_hashes)
+    fetcher.close()
+    save_feed_state(feed_state)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,79 @@
+import json
+import os
+import struct
+import time
+
+# --------------------------------------------------------------------------------------
+# Compact store of the hashes of already scraped items. On disk it is a sorted array of
+# fixed-size records (16-byte MD5 digest + uint32 day number the item was last seen on),
+# 20 bytes per item instead of ~40 for an indented JSON hex string. Items that were not
+# seen for max_age_days are dropped on save, so the file stays bounded. Every membership
+# check refreshes the item's day, so items still listed by a feed or API never expire.
+# Days instead of seconds keep the file unchanged between runs of the same day.
+# --------------------------------------------------------------------------------------
+
+MAGIC = b"SEENv1\0\0"
+RECORD = struct.Struct("<16sI")
+
+
+class SeenHashStore:
+    """
+    Set-like store of seen item hashes (hex MD5 strings from compute_hash).
+
+    Args:
+        path (str): Binary store file
+        max_age_days (float): Items not seen for longer than this are expired on save
+        legacy_json (str): Old JSON list of hex hashes, migrated when the binary store does not exist yet
+    """
+
+    def __init__(self, path, max_age_days, legacy_json=None):
+        self.path = path
+        self.max_age_days = max_age_days
+        self.last_seen = {}
+        now = int(time.time() // 86400)
+
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            if not data.startswith(MAGIC):
+                raise ValueError(f"{path} is not a seen hash store")
+            self.last_seen = {digest: seen for digest, seen in RECORD.iter_unpack(data[len(MAGIC):])}
+        elif legacy_json and os.path.exists(legacy_json):
+            # The JSON list has no times, migrated hashes count as seen today
+            with open(legacy_json, "r", encoding="utf-8") as f:
+                self.last_seen = {bytes.fromhex(h): now for h in json.load(f)}
+            print(f"Migrated {len(self.last_seen)} hashes from {legacy_json} to {path}")
+
+        self.now = now
+
+    def __contains__(self, item_hash):
+        digest = bytes.fromhex(item_hash)
+        if digest in self.last_seen:
+            self.last_seen[digest] = self.now
+            return True
+        return False
+
+    def __len__(self):
+        return len(self.last_seen)
+
+    def add(self, item_hash):
+        self.last_seen[bytes.fromhex(item_hash)] = self.now
+
+    def save(self):
+        """
+        Expire items older than max_age_days and write the remaining ones sorted by digest.
+
+        Returns:
+            int: Number of expired items
+        """
+        cutoff = self.now - self.max_age_days
+        kept = sorted((digest, seen) for digest, seen in self.last_seen.items() if seen >= cutoff)
+        expired = len(self.last_seen) - len(kept)
+        self.last_seen = dict(kept)
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(b"".join(RECORD.pack(digest, seen) for digest, seen in kept))
+        os.replace(tmp_path, self.path)
+        return expired
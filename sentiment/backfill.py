@@ -0,0 +1,147 @@
+from config import (RAW_DATA_CSV, NEWS_WITH_SCORE_CSV, TEMP_DATE_RISK_CSV, AGGREGATED_PARTIALS_CSV, BACKFILL_CHECKPOINT_JSON,
+                    G_LLM, INFERENCE_BACKEND, PROMPT_VERSION, SCORING_MODE)
+from data_preprocessing import load_news
+from risk_score_generation import get_all_scores, append_score_to_csv, build_prompt, open_worker_pool
+from risk_score_aggregation import aggregate_risk_score, _floor_time_half_hour
+from datetime import timedelta
+import hashlib
+import json
+import os
+import pandas as pd
+
+
+def _scoring_fingerprint():
+    """
+    Identifies how the backfill scores the news: the model with its backend, and a hash of the prompts of every source type.
+    A checkpoint written with another model or prompt belongs to scores that would no longer be reproduced.
+
+    Returns:
+        fingerprint (dict): 'model' and 'prompt_hash'
+    """
+    prompts = ''.join(build_prompt(source, '{header}', '{content}') for source in ('News', 'Reddit', 'Tweet'))
+    return {
+        'model': f"{G_LLM}-{INFERENCE_BACKEND}",
+        'prompt_hash': hashlib.sha256(f"{PROMPT_VERSION}-{SCORING_MODE}-{prompts}".encode()).hexdigest(),
+    }
+
+
+def _load_checkpoint():
+    """
+    Loads the progress of an earlier, interrupted backfill run.
+    A day that was being written when the run stopped has its rows cut from news_with_risk_score.csv again, so it is
+    scored once more without duplicated rows. A checkpoint of another model or prompt is dropped.
+
+    Returns:
+        completed (set): ISO dates of the days completed by the interrupted run
+        rescored (set): After a change of the model or the prompt, the ISO dates scored since, None without a change
+    """
+    if not os.path.exists(BACKFILL_CHECKPOINT_JSON):
+        return set(), None
+
+    with open(BACKFILL_CHECKPOINT_JSON, 'r') as f:
+        checkpoint = json.load(f)
+
+    fingerprint = _scoring_fingerprint()
+    if any(checkpoint.get(key) != value for key, value in fingerprint.items()):
+        print(f"Checkpoint written with another model or prompt (model {checkpoint.get('model')}), restarting the backfill.")
+        return set(), set()
+
+    pending = checkpoint.get('pending')
+    if pending and os.path.exists(NEWS_WITH_SCORE_CSV) and os.path.getsize(NEWS_WITH_SCORE_CSV) > pending['offset']:
+        with open(NEWS_WITH_SCORE_CSV, 'r+b') as f:
+            f.truncate(pending['offset'])
+        print(f"{pending['day']}: rows of the interrupted run removed from {NEWS_WITH_SCORE_CSV}.")
+
+    rescored = checkpoint.get('rescored')
+    return set(checkpoint['completed']), set(rescored) if rescored is not None else None
+
+
+def _save_checkpoint(completed, rescored=None, pending=None):
+    """
+    Saves the completed days, written to a temporary file first so an interruption never leaves a broken checkpoint.
+
+    Args:
+        completed (set): ISO dates of the days completed by the current run, empty once it finished its range
+        rescored (set): After a change of the model or the prompt, the ISO dates scored since, None without a change
+        pending (dict): Day being written and the size of news_with_risk_score.csv before its rows, None between days
+    """
+    tmp_path = BACKFILL_CHECKPOINT_JSON + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({**_scoring_fingerprint(), 'completed': sorted(completed),
+                   'rescored': sorted(rescored) if rescored is not None else None, 'pending': pending}, f, indent=4)
+    os.replace(tmp_path, BACKFILL_CHECKPOINT_JSON)
+
+
+def _aggregated_bins():
+    """
+    Loads the (half-hour bin, news day) pairs whose sums are already in aggregated_risk_partials.csv.
+    A bin alone is not enough, the 23:30 bin of a day also gets the news of the first half hour of the next day.
+
+    Returns:
+        bins (set): ('YYYY-MM-DD HH:MM:SS', 'YYYY-MM-DD') pairs of the aggregated bins
+    """
+    if not os.path.exists(AGGREGATED_PARTIALS_CSV):
+        return set()
+    partials = pd.read_csv(AGGREGATED_PARTIALS_CSV, dtype={'datetime': str, 'news_date': str})
+    return set(zip(partials['datetime'], partials['news_date']))
+
+
+def run_backfill(start_date, end_date):
+    """
+    Scores and aggregates the news of every day between start_date and end_date (both inclusive) in one process.
+    Only the part of news.csv covering the range is read, once, and the model (or the model replica of every scoring
+    worker) is loaded once for the whole range.
+    Days whose half-hour bins are all in aggregated_risk_partials.csv are skipped, and every finished day is written
+    to a checkpoint, so an interrupted backfill continues where it stopped when it is started again. Once the whole
+    range is done the completed days are cleared, so a later run scores news that arrived since in new bins.
+    After a change of the model or the prompt, every day is scored again, also in later runs until it was rescored.
+
+    Args:
+        start_date (datetime.date): First day to backfill
+        end_date (datetime.date): Last day to backfill
+
+    Returns:
+        None
+    """
+    df = load_news(RAW_DATA_CSV, start_date, end_date + timedelta(days=1))
+    completed, rescored = _load_checkpoint()
+    aggregated_bins = _aggregated_bins()
+
+    # The scoring workers (NUM_WORKERS > 1) and their model replicas are started once for the whole range
+    with open_worker_pool() as pool:
+        for day in pd.date_range(start_date, end_date, freq='D').date:
+            df_day = df[df['datetime'].dt.date == day]
+
+            if day.isoformat() in completed:
+                print(f"{day}: already completed before the backfill was interrupted, skipped.")
+                continue
+            if df_day.empty:
+                print(f"{day}: no news, skipped.")
+                continue
+            day_bins = zip(_floor_time_half_hour(df_day['datetime']).dt.strftime('%Y-%m-%d %H:%M:%S'), [day.isoformat()] * len(df_day))
+            # Bins aggregated with an old model or prompt do not count
+            if (rescored is None or day.isoformat() in rescored) and set(day_bins) <= aggregated_bins:
+                print(f"{day}: already aggregated, skipped.")
+                completed.add(day.isoformat())
+                _save_checkpoint(completed, rescored)
+                continue
+
+            # Same records as the daily run reads back from processed_data.json
+            json_data = json.loads(json.dumps(df_day.to_dict(orient='records'), default=str))
+            print(f"{day}: scoring {len(json_data)} news")
+
+            risk_scores = get_all_scores(json_data, pool=pool)
+            # Mark the day as being written first, a resumed run cuts news_with_risk_score.csv back to this size
+            offset = os.path.getsize(NEWS_WITH_SCORE_CSV) if os.path.exists(NEWS_WITH_SCORE_CSV) else 0
+            _save_checkpoint(completed, rescored, pending={'day': day.isoformat(), 'offset': offset})
+            append_score_to_csv(json_data, risk_scores, NEWS_WITH_SCORE_CSV)
+            aggregate_risk_score(TEMP_DATE_RISK_CSV)
+
+            completed.add(day.isoformat())
+            if rescored is not None:
+                rescored.add(day.isoformat())
+            _save_checkpoint(completed, rescored)
+
+    # The range is done, a new run of it checks the aggregated bins again instead of skipping the days
+    _save_checkpoint(set(), rescored)
+    print(f"Backfill from {start_date} to {end_date} completed.")
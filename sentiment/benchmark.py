@@ -0,0 +1,157 @@
+import argparse
+import io
+import json
+import os
+import time
+import torch
+import risk_score_generation as rsg
+from config import TEMP_PROCESSED_JSON, BATCH_SIZE, INFERENCE_BACKEND
+
+
+"""
+benchmark.py contains checks of the scoring setup that are run manually, not by the workflow.
+
+    python benchmark.py accuracy --backend int8
+    python benchmark.py parallel --cores 4 --ram-gb 16
+"""
+
+
+def _model_size_mb(model):
+    """
+    Size of the serialized model weights in MB (also counts the packed weights of quantized layers).
+    """
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 1024 ** 2
+
+
+def check_backend_accuracy(backend, path=TEMP_PROCESSED_JSON, batch_size=BATCH_SIZE):
+    """
+    Compare the scores of an inference backend with the fp32 baseline on the checked-in processed data.
+
+    Args:
+        backend (str): Backend to check, "bf16" or "int8".
+        path (str): Processed news JSON file to score.
+        batch_size (int): Number of prompts sent to the model at once.
+
+    Returns:
+        dict: Score agreement, probability differences, scoring time and model size of both backends.
+    """
+    with open(path, 'r') as f:
+        json_data = json.load(f)
+
+    results = {}
+    for name in ("fp32", backend):
+        scorer = rsg.RiskScorer(backend=name)
+
+        start_time = time.perf_counter()
+        scores, probabilities = rsg.get_all_scores(json_data, batch_size=batch_size, mode="logits",
+                                                   return_probs=True, use_cache=False, scorer=scorer)
+        results[name] = {
+            "scores": scores,
+            "probabilities": torch.tensor(probabilities),
+            "seconds": time.perf_counter() - start_time,
+            "size_mb": _model_size_mb(scorer.model),
+        }
+        del scorer
+
+    baseline, candidate = results["fp32"], results[backend]
+    prob_diff = (baseline["probabilities"] - candidate["probabilities"]).abs()
+    report = {
+        "articles": len(json_data),
+        "agreement": sum(a == b for a, b in zip(baseline["scores"], candidate["scores"])) / len(json_data),
+        "max_score_diff": max(abs(a - b) for a, b in zip(baseline["scores"], candidate["scores"])),
+        "mean_prob_diff": prob_diff.mean().item(),
+        "max_prob_diff": prob_diff.max().item(),
+        "fp32_seconds": baseline["seconds"],
+        f"{backend}_seconds": candidate["seconds"],
+        "fp32_size_mb": baseline["size_mb"],
+        f"{backend}_size_mb": candidate["size_mb"],
+    }
+
+    print(f"\n{backend} vs fp32 on {report['articles']} articles from {path}")
+    print(f"  score agreement:      {report['agreement']:.1%} (max difference {report['max_score_diff']})")
+    print(f"  probability diff:     mean {report['mean_prob_diff']:.4f}, max {report['max_prob_diff']:.4f}")
+    print(f"  scoring time:         {baseline['seconds']:.1f}s -> {candidate['seconds']:.1f}s")
+    print(f"  model size:           {baseline['size_mb']:.0f} MB -> {candidate['size_mb']:.0f} MB")
+
+    return report
+
+
+def _available_ram_gb():
+    """
+    Available memory in GB as reported by the OS.
+    """
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 1024 ** 3
+    except (ValueError, OSError, AttributeError):
+        return 4.0
+
+
+def benchmark_parallel(cores=None, ram_gb=None, path=TEMP_PROCESSED_JSON, batch_size=BATCH_SIZE, backend=INFERENCE_BACKEND):
+    """
+    Time every worker/thread split that fits the given cores and RAM and report the fastest one.
+
+    Args:
+        cores (int): CPU cores to use, defaults to all cores.
+        ram_gb (float): RAM available for model replicas, defaults to the currently available memory.
+        path (str): Processed news JSON file to score.
+        batch_size (int): Number of prompts sent to the model at once.
+        backend (str): CPU inference backend of the replicas.
+
+    Returns:
+        dict: (workers, threads per worker) -> articles/sec for every setting that was run.
+    """
+    cores = cores or os.cpu_count() or 1
+    ram_gb = ram_gb or _available_ram_gb()
+    with open(path, 'r') as f:
+        json_data = json.load(f)
+
+    # Weights plus headroom for activations and the prefix caches
+    replica_gb = 1.5 * _model_size_mb(rsg.RiskScorer(backend=backend).model) / 1024
+    max_workers = max(1, min(cores, int(ram_gb // replica_gb), len(json_data)))
+    print(f"{cores} cores, {ram_gb:.1f} GB RAM, ~{replica_gb:.1f} GB per replica -> up to {max_workers} worker(s)")
+
+    results = {}
+    for workers in range(1, max_workers + 1):
+        threads = cores // workers
+        # Skip splits that would leave cores idle, except the single worker baseline
+        if workers > 1 and (cores % workers or threads < 1):
+            continue
+        start_time = time.perf_counter()
+        rsg.get_all_scores(json_data, batch_size=batch_size, use_cache=False,
+                           scorer=rsg.RiskScorer(backend=backend) if workers == 1 else None,
+                           n_workers=workers, threads_per_worker=threads)
+        results[(workers, threads)] = len(json_data) / (time.perf_counter() - start_time)
+
+    print(f"\nScoring throughput on {len(json_data)} articles ({backend} backend):")
+    for (workers, threads), rate in results.items():
+        print(f"  {workers} worker(s) x {threads} thread(s): {rate:.2f} articles/sec")
+    workers, threads = max(results, key=results.get)
+    print(f"Best setting: NUM_WORKERS = {workers}, TORCH_THREADS_PER_WORKER = {threads}")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the sentiment scoring stage")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    accuracy_parser = subparsers.add_parser("accuracy", help="compare a backend with the fp32 scores")
+    accuracy_parser.add_argument("--backend", choices=["bf16", "int8"], default="int8")
+    accuracy_parser.add_argument("--path", default=TEMP_PROCESSED_JSON)
+    accuracy_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    parallel_parser = subparsers.add_parser("parallel", help="find the best worker/thread split")
+    parallel_parser.add_argument("--cores", type=int, default=None)
+    parallel_parser.add_argument("--ram-gb", type=float, default=None)
+    parallel_parser.add_argument("--backend", choices=["fp32", "bf16", "int8"], default=INFERENCE_BACKEND)
+    parallel_parser.add_argument("--path", default=TEMP_PROCESSED_JSON)
+    parallel_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    args = parser.parse_args()
+    if args.command == "accuracy":
+        check_backend_accuracy(args.backend, path=args.path, batch_size=args.batch_size)
+    elif args.command == "parallel":
+        benchmark_parallel(cores=args.cores, ram_gb=args.ram_gb, path=args.path,
+                           batch_size=args.batch_size, backend=args.backend)
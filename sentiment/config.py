@@ -2,14 +2,61 @@ import torch
 
 # Paths
 RAW_DATA_CSV = '../scrape/news.csv'
+RAW_DATA_PARQUET = '../scrape/news_parquet'
 TEMP_PROCESSED_JSON = 'temp/processed_data.json'
 NEWS_WITH_SCORE_CSV = 'news_with_risk_score.csv'
 TEMP_DATE_RISK_CSV = 'temp/date_risk.csv'
+TEMP_TOKEN_COUNTS_CSV = 'temp/token_counts.csv'
 AGGREGATED_WEIGHTS_CSV = 'aggregated_risk_scores.csv'
+AGGREGATED_PARTIALS_CSV = 'aggregated_risk_partials.csv'
+SCORE_CACHE_DB = 'temp/score_cache.sqlite'
+BACKFILL_CHECKPOINT_JSON = 'temp/backfill_checkpoint.json'
+NEWS_INDEX_JSON = 'temp/news_index.json'
 
 # Model
 G_LLM = "deepseek-ai/DeepSeek-R1-Distill-Qwen-1.5B"
 
+# CPU inference backend: "fp32" (full precision), "bf16" (bfloat16 weights, needs a CPU with native bf16 support)
+# or "int8" (dynamic int8 quantization of the linear layers). Run `python benchmark.py accuracy --backend int8`
+# to compare a backend with the fp32 scores before switching.
+INFERENCE_BACKEND = "fp32"
+
+# Number of prompts scored together in one padded batch
+BATCH_SIZE = 8
+
+# Number of scoring processes, each holding its own model replica, and the torch threads of each process.
+# More workers with fewer threads each usually scale better on many cores, as long as every replica fits in RAM.
+# None splits the CPU cores evenly across the workers. Run `python benchmark.py parallel` to find the best setting.
+NUM_WORKERS = 1
+TORCH_THREADS_PER_WORKER = None
+
+# "logits" reads the next-token probabilities of "1"-"5" in a single forward pass,
+# "generate" lets the model write a free-form answer that is parsed afterwards
+SCORING_MODE = "logits"
+
+# Token budget for the content of each article, longer articles are truncated
+# with "head_tail" (start and end of the article) or "lead" (leading sentences)
+MAX_CONTENT_TOKENS = 1024
+TRUNCATION_STRATEGY = "head_tail"
+
+# Instead of truncating, split long articles into chunks of MAX_CONTENT_TOKENS and pool their scores
+CHUNK_LONG_ARTICLES = False
+MAX_CHUNKS_PER_ARTICLE = 4
+
+# Bump whenever the prompt template changes, so cached scores of the old prompt are not reused
+PROMPT_VERSION = "v1"
+
+# Maximum number of scores kept in the score cache, least recently used ones are evicted first
+SCORE_CACHE_MAX_ENTRIES = 50000
+
+# "parquet" reads only the needed days and columns of the date-partitioned copy written by the scraper,
+# "csv" reads news.csv (also used while the Parquet copy does not exist yet)
+NEWS_STORAGE = "parquet"
+
+# Number of news.csv rows per block of the byte-offset index, only the blocks overlapping
+# the requested dates are read from news.csv
+NEWS_INDEX_BLOCK_ROWS = 500
+
 # Specific source weights
 SOURCE_WEIGHTS = {
                   "investing": 0.0360, 
@@ -1,23 +1,51 @@
 from datetime import datetime, timedelta
 import json
+import os
 import pandas as pd
-import re
-from config import TEMP_PROCESSED_JSON
+from config import TEMP_PROCESSED_JSON, NEWS_INDEX_JSON, NEWS_INDEX_BLOCK_ROWS, NEWS_STORAGE, RAW_DATA_PARQUET
+from news_index import update_news_index, read_news_rows, read_news_partitions, parse_timestamps, weekend_to_monday
 import sys
 
-def data_preprocessing(path):
+NEWS_COLUMNS = ["datetime", "header", "content", "source", "specific_source", "link"]
+
+
+def load_news(path, start_date=None, end_date=None, columns=NEWS_COLUMNS):
     """
-    Reads news.csv, normalises timestamps, shifts weekend entries to Monday 09:00,
-    extracts ONLY yesterday’s rows, and writes them to TEMP_PROCESSED_JSON.
+    Reads the scraped news, normalises timestamps, shifts weekend entries to Monday 09:00
+    and sorts all rows chronologically. With NEWS_STORAGE = "parquet" only the needed day
+    partitions and columns of the Parquet copy are read, otherwise only the blocks of news.csv
+    covering the date range (found through the sidecar byte-offset index).
 
     Args
     ----
     path : str
         File path to news.csv
+    start_date : datetime.date, optional
+        First day to keep, defaults to the first day in news.csv
+    end_date : datetime.date, optional
+        Day after the last day to keep (exclusive), defaults to the last day in news.csv
+    columns : list, optional
+        Columns to load, 'datetime' is always loaded
+
+    Returns
+    -------
+    pandas DataFrame with the columns, by default datetime, header, content, source, specific_source, link
     """
-    try:
-        # ───────────────────────── 1. LOAD & RENAME ──────────────────────────
-        df = pd.read_csv(path, delimiter=";", encoding="utf-8", quotechar='"', on_bad_lines="skip")
+    # ───────────────────────── 1. LOAD & RENAME ──────────────────────────
+    # A missing bound is None, so the whole file is read on that side
+    start = pd.Timestamp(start_date) if start_date else None
+    end = pd.Timestamp(end_date) if end_date else None
+
+    # Weekend entries move forward to Monday, so they are read from up to two days before start_date
+    read_start = start - timedelta(days=2) if start is not None else None
+    columns = ["datetime"] + [c for c in columns if c != "datetime"]
+
+    if NEWS_STORAGE == "parquet" and os.path.isdir(RAW_DATA_PARQUET):
+        # Timestamps are stored parsed, no step 2 needed
+        df = read_news_partitions(RAW_DATA_PARQUET, read_start, end, columns)
+    else:
+        index = update_news_index(path, NEWS_INDEX_JSON, NEWS_INDEX_BLOCK_ROWS)
+        df = read_news_rows(path, index, read_start, end)
         df = df.rename(columns={
             "Date and Timestamp": "datetime",
             "Title": "header",
@@ -25,40 +53,48 @@ def data_preprocessing(path):
             "Source": "source",
             "SpecificSource": "specific_source",
             "Link": "link",
-        })
+        })[columns]
 
         # ──────────────────────── 2. PARSE DATETIMES ─────────────────────────
-        def _standardise(dt):
-            # Match e.g. '16.3.2025 12:51' then convert to ISO-like string
-            if isinstance(dt, str) and re.match(r"^\d{1,2}\.\d{1,2}\.\d{4} \d{1,2}:\d{2}$", dt):
-                return pd.to_datetime(dt, dayfirst=True, errors="coerce")
-            return pd.to_datetime(dt, errors="coerce")
+        # e.g. '16.3.2025 12:51' is parsed day first
+        df["datetime"] = parse_timestamps(df["datetime"])
+    df = df.dropna(subset=["datetime"])                       # discard unparsable rows
 
-        df["datetime"] = df["datetime"].apply(_standardise)
-        df = df.dropna(subset=["datetime"])                       # discard unparsable rows
+    # ─────────────────────── 3. WEEKEND → MONDAY 09:00 ───────────────────
+    df["datetime"] = weekend_to_monday(df["datetime"])
+    if start is not None:
+        df = df[df["datetime"] >= start]
+    if end is not None:
+        df = df[df["datetime"] < end]
 
-        # ─────────────────────── 3. WEEKEND → MONDAY 09:00 ───────────────────
-        def _weekend_to_monday(dt):
-            # 5 = Saturday, 6 = Sunday
-            if dt.weekday() in (5, 6):
-                return (dt + timedelta(days=7 - dt.weekday())
-                       ).replace(hour=9, minute=0, second=0, microsecond=0)
-            return dt
+    # ───────────────────────── 4. SORT CHRONOLOGICALLY ───────────────────
+    return df.sort_values("datetime").reset_index(drop=True)
 
-        df["datetime"] = df["datetime"].apply(_weekend_to_monday)
 
-        # ───────────────────────── 4. SORT CHRONOLOGICALLY ───────────────────
-        df = df.sort_values("datetime").reset_index(drop=True)
+def data_preprocessing(path, start_date=None, end_date=None):
+    """
+    Reads news.csv, normalises timestamps, shifts weekend entries to Monday 09:00,
+    extracts ONLY the rows between start_date and end_date (yesterday by default),
+    and writes them to TEMP_PROCESSED_JSON.
 
+    Args
+    ----
+    path : str
+        File path to news.csv
+    start_date : datetime.date, optional
+        First day to extract, defaults to yesterday
+    end_date : datetime.date, optional
+        Day after the last day to extract (exclusive), defaults to today
+    """
+    try:
         # ──────────────────────── 5. FILTER “YESTERDAY” ──────────────────────
-        start_date = (datetime.now() - timedelta(days=1)).date()   # 00:00 yesterday
-        end_date   =  datetime.now().date()                        # 00:00 today
+        start_date = start_date or (datetime.now() - timedelta(days=1)).date()   # 00:00 yesterday
+        end_date   = end_date or datetime.now().date()                           # 00:00 today
 
-        df_subset = df[(df["datetime"].dt.date >= start_date) &
-                       (df["datetime"].dt.date <  end_date)]
+        df_subset = load_news(path, start_date, end_date)
 
         if df_subset.empty:
-            raise ValueError("No data available for yesterday’s window; df_subset is empty.")
+            raise ValueError(f"No data available between {start_date} and {end_date}; df_subset is empty.")
 
         # ───────────────────────── 6. SAVE AS JSON ───────────────────────────
         with open(TEMP_PROCESSED_JSON, "w") as f:
@@ -67,4 +103,4 @@ def data_preprocessing(path):
 
     except Exception as e:
         print(f"[Error in data preprocessing pipeline] -> {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -2,28 +2,41 @@ from config import RAW_DATA_CSV, TEMP_PROCESSED_JSON, NEWS_WITH_SCORE_CSV, TEMP_
 from data_preprocessing import data_preprocessing
 from risk_score_generation import get_all_scores, append_score_to_csv
 from risk_score_aggregation import aggregate_risk_score
+from backfill import run_backfill
+from datetime import date
+import argparse
 import json
 import sys
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sentiment pipeline, scores yesterday's news unless a backfill range is given")
+    parser.add_argument("--start", type=date.fromisoformat, help="first day to backfill (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day to backfill (YYYY-MM-DD), defaults to --start")
+    args = parser.parse_args()
+
     try:
-        # Extract yesterday's news from news.csv and save it as JSON file
-        data_preprocessing(path=RAW_DATA_CSV)
-
-        # Get the processed data JSON file
-        with open(TEMP_PROCESSED_JSON, 'r') as f:
-            json_data = json.load(f)
-        
-        # Generate risk score for each news
-        risk_scores = get_all_scores(json_data)
-        
-        # Append new data with risk score for tracing purposes
-        append_score_to_csv(json_data, risk_scores, NEWS_WITH_SCORE_CSV)
-        
-        # Aggregate risk score
-        aggregate_risk_score(TEMP_DATE_RISK_CSV)
-        
+        if args.start:
+            # Score and aggregate every day between --start and --end in one run
+            run_backfill(args.start, args.end or args.start)
+
+        else:
+            # Extract yesterday's news from news.csv and save it as JSON file
+            data_preprocessing(path=RAW_DATA_CSV)
+
+            # Get the processed data JSON file
+            with open(TEMP_PROCESSED_JSON, 'r') as f:
+                json_data = json.load(f)
+
+            # Generate risk score for each news
+            risk_scores = get_all_scores(json_data)
+
+            # Append new data with risk score for tracing purposes
+            append_score_to_csv(json_data, risk_scores, NEWS_WITH_SCORE_CSV)
+
+            # Aggregate risk score
+            aggregate_risk_score(TEMP_DATE_RISK_CSV)
+
 
     except Exception as e:
         print(f"Error occured in main.py -> {e}")
@@ -0,0 +1,214 @@
+import hashlib
+import io
+import json
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+"""
+news_index.py keeps a sidecar byte-offset index of news.csv, so only the part of the file
+covering the requested dates has to be read and parsed. It also reads the date-partitioned
+Parquet copy of news.csv, opening only the partitions of the requested dates.
+
+The index splits news.csv into blocks of NEWS_INDEX_BLOCK_ROWS rows and stores the byte range and
+the earliest/latest timestamp of every block. As news.csv only grows by appending, every run
+indexes just the bytes appended since the last run. A fingerprint of the last indexed bytes
+detects a rewritten file, in which case the index is rebuilt from scratch.
+"""
+
+
+_FINGERPRINT_BYTES = 4096
+
+
+def parse_timestamps(values):
+    """
+    Vectorized version of the timestamp normalisation: '16.3.2025 12:51' is parsed day first,
+    'YYYY-MM-DD HH:MM:SS' with a fixed format, anything else per value, unparsable values become NaT.
+
+    Args:
+        values (pandas Series): Raw 'Date and Timestamp' strings
+
+    Returns:
+        pandas Series: datetime64 timestamps
+    """
+    values = values.astype("string").str.strip()
+    parsed = pd.to_datetime(values, format="%Y-%m-%d %H:%M:%S", errors="coerce")
+
+    dotted = values.str.match(r"^\d{1,2}\.\d{1,2}\.\d{4} \d{1,2}:\d{2}$", na=False)
+    if dotted.any():
+        parsed[dotted] = pd.to_datetime(values[dotted], format="%d.%m.%Y %H:%M", errors="coerce")
+
+    # Formats other than the two above are rare, fall back to per value parsing only for them.
+    # Values with a UTC offset are converted to naive UTC like the rest
+    other = parsed.isna() & values.notna() & ~dotted
+    if other.any():
+        parsed[other] = pd.to_datetime(values[other], format="mixed", errors="coerce", utc=True).dt.tz_convert(None)
+
+    return parsed
+
+
+def weekend_to_monday(dates):
+    """
+    Vectorized shift of Saturday and Sunday timestamps to the following Monday 09:00.
+
+    Args:
+        dates (pandas Series): datetime64 timestamps
+
+    Returns:
+        pandas Series: Shifted timestamps
+    """
+    weekday = dates.dt.weekday
+    monday = dates.dt.normalize() + pd.to_timedelta(7 - weekday, unit="D") + pd.Timedelta(hours=9)
+    return dates.where(weekday < 5, monday)
+
+
+def _fingerprint(f, end):
+    """
+    Hash of the last indexed bytes, used to notice when news.csv was rewritten instead of appended to.
+    """
+    f.seek(max(0, end - _FINGERPRINT_BYTES))
+    return hashlib.sha256(f.read(end - f.tell())).hexdigest()
+
+
+def _first_field(record):
+    """
+    First field ('Date and Timestamp') of a raw ';' separated news.csv record.
+    """
+    if record.startswith(b'"'):
+        return record[1:record.find(b'"', 1)].decode("utf-8", errors="replace")
+    return record.split(b";", 1)[0].decode("utf-8", errors="replace")
+
+
+def _close_block(blocks, start, end, fields):
+    """
+    Append a block with the earliest and latest timestamp of its rows to the index.
+    """
+    dates = parse_timestamps(pd.Series(fields)).dropna()
+    blocks.append({
+        "start": start,
+        "end": end,
+        "min": dates.min().isoformat() if not dates.empty else None,
+        "max": dates.max().isoformat() if not dates.empty else None,
+    })
+
+
+def update_news_index(path, index_path, block_rows):
+    """
+    Bring the byte-offset index of news.csv up to date, indexing only the bytes appended since the last update.
+
+    Args:
+        path (str): File path to news.csv
+        index_path (str): File path of the sidecar index JSON
+        block_rows (int): Number of rows per indexed block
+
+    Returns:
+        dict: The index with the header length, the indexed size and the blocks
+    """
+    index = None
+    if os.path.exists(index_path):
+        with open(index_path, "r") as f:
+            index = json.load(f)
+
+    with open(path, "rb") as f:
+        header = f.readline()
+
+        if (index is None or index.get("block_rows") != block_rows or index["header_end"] != len(header)
+                or os.path.getsize(path) < index["size"] or _fingerprint(f, index["size"]) != index["fingerprint"]):
+            index = {"block_rows": block_rows, "header_end": len(header), "size": len(header), "blocks": []}
+
+        # Stream the new bytes line by line. Quoted fields may contain line breaks, a record only
+        # ends at a line break after an even number of quote characters.
+        f.seek(index["size"])
+        record_start = block_start = index["size"]
+        record, fields = b"", []
+        quotes = 0
+        for line in f:
+            record += line
+            quotes += line.count(b'"')
+            if quotes % 2 or not line.endswith(b"\n"):
+                continue
+
+            if record.strip():
+                fields.append(_first_field(record))
+            record_start += len(record)
+            record, quotes = b"", 0
+
+            if len(fields) == block_rows:
+                _close_block(index["blocks"], block_start, record_start, fields)
+                block_start, fields = record_start, []
+
+        if fields:
+            _close_block(index["blocks"], block_start, record_start, fields)
+
+        # An unfinished last record is left for the next update
+        index["size"] = record_start
+        index["fingerprint"] = _fingerprint(f, record_start)
+
+    if os.path.dirname(index_path):
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+
+    return index
+
+
+def read_news_rows(path, index, start, end):
+    """
+    Read only the news.csv rows of the blocks whose timestamps overlap [start, end).
+
+    Args:
+        path (str): File path to news.csv
+        index (dict): Index returned by update_news_index
+        start (pandas Timestamp): Earliest raw timestamp needed, None for no lower bound
+        end (pandas Timestamp): Timestamp after the latest one needed (exclusive), None for no upper bound
+
+    Returns:
+        pandas DataFrame: The raw rows of the overlapping blocks, with the news.csv columns
+    """
+    blocks = [block for block in index["blocks"]
+              if block["min"] is not None
+              and (end is None or pd.Timestamp(block["min"]) < end)
+              and (start is None or pd.Timestamp(block["max"]) >= start)]
+
+    chunks = []
+    with open(path, "rb") as f:
+        header = f.readline()
+        for block in blocks:
+            f.seek(block["start"])
+            chunk = f.read(block["end"] - block["start"])
+            chunks.append(pd.read_csv(io.BytesIO(header + chunk), delimiter=";", encoding="utf-8",
+                                      quotechar='"', on_bad_lines="skip"))
+
+    if not chunks:
+        return pd.read_csv(io.BytesIO(header), delimiter=";", encoding="utf-8", quotechar='"')
+    return pd.concat(chunks, ignore_index=True)
+
+
+def read_news_partitions(root, start, end, columns):
+    """
+    Read the given columns of the Parquet partitions (news_parquet/date=YYYY-MM-DD) of the days overlapping [start, end).
+
+    Args:
+        root (str): Root folder of the partitions
+        start (pandas Timestamp): Earliest raw timestamp needed, None for no lower bound
+        end (pandas Timestamp): Timestamp after the latest one needed (exclusive), None for no upper bound
+        columns (list): Columns to load, e.g. ['datetime', 'header', 'content', 'source', 'specific_source']
+
+    Returns:
+        pandas DataFrame: The rows of the partitions, 'datetime' already parsed
+    """
+    tables = []
+    for name in sorted(os.listdir(root)):
+        if not name.startswith("date="):
+            continue
+        day = pd.Timestamp(name[len("date="):])
+        if (start is None or start.normalize() <= day) and (end is None or day < end):
+            tables.append(pq.read_table(os.path.join(root, name, "news.parquet"), columns=columns))
+
+    if not tables:
+        return pd.DataFrame(columns=columns)
+    return pa.concat_tables(tables).to_pandas()
@@ -1,47 +1,87 @@
+import os
 import pandas as pd
-from config import SOURCE_WEIGHTS, AGGREGATED_WEIGHTS_CSV
-from datetime import datetime, timedelta
-from tqdm import tqdm
+from config import SOURCE_WEIGHTS, AGGREGATED_WEIGHTS_CSV, AGGREGATED_PARTIALS_CSV
 
 
-def _floor_time_half_hour(date):
+def _floor_time_half_hour(dates):
     """
-    Rounds a given datetime object down to the nearest half-hour e.g 8:30, 9:30, 10:30
+    Rounds datetimes down to the nearest half-hour e.g 8:30, 9:30, 10:30
 
     Args:
-        date (datetime or str): The datetime object or string representation of the datetime to be rounded
+        dates (pandas Series): Series of datetimes to be rounded
 
     Returns:
-        datetime: A new datetime object representing the rounded-down time
+        pandas Series: The rounded-down datetimes
     """
-    if isinstance(date, str):
-        date = datetime.strptime(date, "%Y-%m-%d %H:%M:%S")
-    minutes = date.minute
-    if minutes < 30:
-        round_date = date.replace(minute=30, second=0, microsecond=0) - timedelta(hours=1)
-    else:
-        round_date = date.replace(minute=30, second=0, microsecond=0)
-        
-    return round_date
+    # 8:45 -> 8:30 and 8:10 -> 7:30
+    half_past = dates.dt.floor('h') + pd.Timedelta(minutes=30)
+    return half_past - pd.to_timedelta((dates.dt.minute < 30).astype(int), unit='h')
     
     
-def get_source_weight(specific_source):
+def get_source_weights(specific_sources):
     """
-    Creates a new column to match each row's source to its respective weight
+    Matches each row's source to its respective weight
 
     Args:
-        specific_source (str): The specific source of the data, e.g yahoo finance, foxbusiness etc
+        specific_sources (pandas Series): The specific source of each row, e.g yahoo finance, foxbusiness etc
         
     Returns:
-        source weight (float): The weight of the respective source
+        source weights (pandas Series): The weight of the respective source
     """
-    if specific_source in SOURCE_WEIGHTS.keys():
-        return SOURCE_WEIGHTS[specific_source]
-
-    else:
-        return 0.0400  # Default weight if source is unknown
+    return specific_sources.map(SOURCE_WEIGHTS).fillna(0.0400)  # Default weight if source is unknown
     
     
+def _write_csv(df, path):
+    # Write to a temporary file first, so an interruption never leaves a half written file
+    tmp_path = path + '.tmp'
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def upsert_aggregated_scores(partials_df, path=AGGREGATED_WEIGHTS_CSV, partials_path=AGGREGATED_PARTIALS_CSV):
+    """
+    Writes the weighted score sums of a run into aggregated_risk_partials.csv and recomputes the touched bins of aggregated_risk_scores.csv.
+    The partial sums are keyed by ('datetime', 'news_date'): the 23:30 bin spans midnight, so two consecutive days both add
+    news to it and their sums are added up, while rerunning a day replaces its own sums and never counts them twice.
+    aggregated_risk_scores.csv keeps one row per bin, sorted by datetime, so the finrl stage can binary search it for the trade window.
+
+    Args:
+        partials_df (pandas DataFrame): Columns 'datetime' (bin), 'news_date', 'weighted_score_sum' and 'weight_sum'
+        path (str): aggregated_risk_scores.csv
+        partials_path (str): aggregated_risk_partials.csv
+
+    Returns:
+        pandas DataFrame: The recomputed bins with columns 'datetime' and 'avg_weighted_score'
+    """
+    new_partials = partials_df[['datetime', 'news_date', 'weighted_score_sum', 'weight_sum']].copy()
+    new_partials['datetime'] = pd.to_datetime(new_partials['datetime']).dt.strftime('%Y-%m-%d %H:%M:%S')
+
+    partials = new_partials
+    if os.path.exists(partials_path):
+        partials = pd.concat([pd.read_csv(partials_path, dtype={'datetime': str, 'news_date': str}), new_partials], ignore_index=True)
+
+    # ISO formatted datetimes sort chronologically as strings
+    partials = partials.drop_duplicates(subset=['datetime', 'news_date'], keep='last').sort_values(['datetime', 'news_date'])
+    _write_csv(partials, partials_path)
+
+    # Every bin touched by this run is recomputed from all of its partial sums
+    touched = partials[partials['datetime'].isin(new_partials['datetime'])]
+    grouped = touched.groupby('datetime')[['weighted_score_sum', 'weight_sum']].sum()
+    avg_weighted_score = (grouped['weighted_score_sum'] / grouped['weight_sum']).where(grouped['weight_sum'] != 0, 0)
+    bins_df = pd.DataFrame({
+        'datetime': grouped.index,
+        'avg_weighted_score': avg_weighted_score.round().astype(int).values
+    })
+
+    aggregated = bins_df
+    if os.path.exists(path):
+        aggregated = pd.concat([pd.read_csv(path, dtype={'datetime': str}), bins_df], ignore_index=True)
+    aggregated = aggregated.drop_duplicates(subset='datetime', keep='last').sort_values('datetime')
+    _write_csv(aggregated, path)
+
+    return bins_df
+
+
 def aggregate_risk_score(filename):
     """
     Aggregates the hourly bin risk scores by calculating the calculated average score.
@@ -56,26 +96,23 @@ def aggregate_risk_score(filename):
 
     # Apply the flooring to datetime column
     df['datetime'] = pd.to_datetime(df['datetime'])
-    df['floored_datetime'] = df['datetime'].apply(_floor_time_half_hour)
+    df['floored_datetime'] = _floor_time_half_hour(df['datetime'])
 
     # Assign weights according to source
-    df['weight'] = df['specific_source'].apply(get_source_weight)
-    
-    aggregated = []
-    grouped = df.groupby('floored_datetime')
-
-    # Calculate average weighted risk score for each hourly bin
-    for floored_time, group in tqdm(grouped, desc="Aggregating risk scores"):
-        weighted_sum = (group['risk score'] * group['weight']).sum()
-        total_weight = group['weight'].sum()
-        avg_weighted_score = weighted_sum / total_weight if total_weight != 0 else 0
-        avg_weighted_score = round(avg_weighted_score)
-        aggregated.append({
-            'datetime': floored_time,
-            'avg_weighted_score': avg_weighted_score
-        })
-
-    # Convert result into new dataframe and append to aggregated_risk_scores.csv
-    result_df = pd.DataFrame(aggregated)
-    result_df.to_csv(AGGREGATED_WEIGHTS_CSV , mode='a', header=False, index=False)
-    print(f"Appended aggregated weights to existing CSV: {AGGREGATED_WEIGHTS_CSV }")
\ No newline at end of file
+    df['weight'] = get_source_weights(df['specific_source'])
+    df['weighted_score'] = df['risk score'] * df['weight']
+
+    # Sum the weighted scores and weights of each hourly bin, per publication day of the news
+    df['news_date'] = df['datetime'].dt.strftime('%Y-%m-%d')
+    grouped = df.groupby(['floored_datetime', 'news_date'])[['weighted_score', 'weight']].sum().reset_index()
+
+    partials_df = pd.DataFrame({
+        'datetime': grouped['floored_datetime'],
+        'news_date': grouped['news_date'],
+        'weighted_score_sum': grouped['weighted_score'],
+        'weight_sum': grouped['weight']
+    })
+
+    # Add the sums to the bins in aggregated_risk_scores.csv, the average weighted score is recomputed from all days of a bin
+    bins_df = upsert_aggregated_scores(partials_df, AGGREGATED_WEIGHTS_CSV, AGGREGATED_PARTIALS_CSV)
+    print(f"Upserted {len(bins_df)} aggregated bins into {AGGREGATED_WEIGHTS_CSV}")
@@ -1,44 +1,95 @@
+import contextlib
+import copy
+import multiprocessing
+import os
 import pandas as pd
 import re
+import time
 from tqdm import tqdm
-from config import G_LLM, TEMP_DATE_RISK_CSV
-from transformers import AutoTokenizer, AutoModelForCausalLM
-import transformers
+from config import (G_LLM, TEMP_DATE_RISK_CSV, TEMP_TOKEN_COUNTS_CSV, BATCH_SIZE, SCORING_MODE, PROMPT_VERSION,
+                    SCORE_CACHE_DB, SCORE_CACHE_MAX_ENTRIES, MAX_CONTENT_TOKENS, TRUNCATION_STRATEGY,
+                    CHUNK_LONG_ARTICLES, MAX_CHUNKS_PER_ARTICLE, INFERENCE_BACKEND, NUM_WORKERS,
+                    TORCH_THREADS_PER_WORKER)
+from score_cache import ScoreCache
+import torch
 import sys
 
 
-tokenizer = AutoTokenizer.from_pretrained(G_LLM)
-model = AutoModelForCausalLM.from_pretrained(G_LLM)
+# Candidate answers for the single-token scoring mode
+SCORE_LABELS = [1, 2, 3, 4, 5]
 
-risk_scores = []
 
-def get_risk_score(source, header, content):
+def _cpu_supports_bf16():
     """
-    Generate risk score for each news/reddit/tweet entry using the provided pipeline.
+    Check whether the CPU has native bfloat16 instructions (AVX512-BF16 or AMX).
+
+    Returns:
+        bool: True if bfloat16 matrix multiplications run natively on this CPU.
+    """
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+        return "avx512_bf16" in flags or "amx_bf16" in flags
+    except OSError:
+        return False
+
+
+def load_model(backend=INFERENCE_BACKEND, model_id=G_LLM):
+    """
+    Load the DeepSeek model for the selected CPU inference backend.
+
+    Args:
+        backend (str): "fp32" full precision, "bf16" bfloat16 weights (only if the CPU supports it natively),
+            or "int8" dynamic int8 quantization of the linear layers.
+        model_id (str): Hugging Face model name or local path.
+
+    Returns:
+        AutoModelForCausalLM: The loaded model in evaluation mode.
+    """
+    # Imported here, as importing transformers alone takes seconds
+    from transformers import AutoModelForCausalLM
+
+    if backend == "bf16" and not _cpu_supports_bf16():
+        print("⚠️ CPU has no native bfloat16 support, falling back to the fp32 backend.")
+        backend = "fp32"
+
+    if backend == "bf16":
+        loaded_model = AutoModelForCausalLM.from_pretrained(model_id, dtype=torch.bfloat16)
+    else:
+        loaded_model = AutoModelForCausalLM.from_pretrained(model_id)
+
+    if backend == "int8":
+        loaded_model = torch.ao.quantization.quantize_dynamic(loaded_model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif backend not in ("fp32", "bf16"):
+        raise ValueError(f"Unknown inference backend '{backend}', use 'fp32', 'bf16' or 'int8'")
+
+    print(f"Loaded {model_id} with the {backend} backend.")
+    return loaded_model.eval()
+
+
+def build_prompt_prefix(source):
+    """
+    Build the fixed part of the prompt (instruction and scoring rules) that is shared by every entry of a source type.
 
     Args:
-        pipeline (pipeline object): Text generation pipeline.
         source (str): Source of the data ("News", "Reddit", or "Tweet").
-        header (str): Header/title of the news/reddit/tweet entry.
-        content (str): Content/body of the news/reddit/tweet entry.
 
     Returns:
-        int: Risk score assigned to the news/reddit/tweet entry.
+        str: The prompt text up to and including the "### Input:" line.
     """
-    try:
-        if (source.lower() == "news") or (source.lower() == "reddit"):
-            prompt_instruction = f"""### Instruction:
+    if (source.lower() == "news") or (source.lower() == "reddit"):
+        prompt_instruction = f"""### Instruction:
                     You are a financial expert specializing in risk assessment for Nvidia stock recommendations.
                     Given the headline and content of a {source.lower()} article, assess the risk level for investing in Nvidia stock.
                     """
-        else:
-            prompt_instruction = f"""### Instruction:
+    else:
+        prompt_instruction = f"""### Instruction:
                     You are a financial expert specializing in risk assessment for Nvidia stock recommendations.
                     Given the content of a tweet, assess the stock market condition and how it relates to the
                     risk level for investing in Nvidia stock.
                     """
 
-        prompt_body = f"""
+    prompt_rules = """
                     Assign a risk score from 1 to 5, where:
                     1 = very low risk,
                     2 = low risk,
@@ -55,68 +106,631 @@ def get_risk_score(source, header, content):
                         - Think step-by-step before making your decision.
 
                     ### Input:
-                    Headline: {header}
+"""
+
+    return prompt_instruction + prompt_rules
+
+
+def build_prompt_suffix(header, content):
+    """
+    Build the entry specific part of the prompt that follows build_prompt_prefix.
+
+    Args:
+        header (str): Header/title of the news/reddit/tweet entry.
+        content (str): Content/body of the news/reddit/tweet entry.
+
+    Returns:
+        str: The prompt text from the headline up to "Risk score:".
+    """
+    return f"""                    Headline: {header}
                     Content: {content}
 
                     ### Response:
                     Risk score:"""
 
-        prompt = prompt_instruction + prompt_body
 
-        pipeline = transformers.pipeline(
-            "text-generation",
-            model=model,
-            tokenizer=tokenizer,
-            temperature=0.1,
-            do_sample=True,
-            top_k=10,
-            num_return_sequences=1,
-            return_full_text=False,
-            eos_token_id=tokenizer.eos_token_id
-        )
+def build_prompt(source, header, content):
+    """
+    Build the risk assessment prompt for a news/reddit/tweet entry.
 
-        response = pipeline(prompt)[0]['generated_text']
+    Args:
+        source (str): Source of the data ("News", "Reddit", or "Tweet").
+        header (str): Header/title of the news/reddit/tweet entry.
+        content (str): Content/body of the news/reddit/tweet entry.
+
+    Returns:
+        str: The full prompt passed to the model.
+    """
+    return build_prompt_prefix(source) + build_prompt_suffix(header, content)
 
-        # Extract risk score from response
-        match = re.search(r'(\d)\s*<\/think>', response)
-        if not match:
-            match = re.search(r'\b([1-5])\b', response)
 
-        if match:
-            score = int(match.group(1))
-            risk_scores.append(score)
-            print(f"Extracted risk score: {score}")
+def parse_risk_score(response):
+    """
+    Extract the risk score from the generated model response.
 
-        else:
-            print("⚠️ Could not extract risk score from response:", response)
-            risk_scores.append(3)
+    Args:
+        response (str): Generated text returned by the pipeline.
+
+    Returns:
+        int: Extracted risk score, or 3 (moderate risk) if no score could be found.
+    """
+    match = re.search(r'(\d)\s*<\/think>', response)
+    if not match:
+        match = re.search(r'\b([1-5])\b', response)
+
+    if match:
+        score = int(match.group(1))
+        print(f"Extracted risk score: {score}")
+        return score
+
+    print("⚠️ Could not extract risk score from response:", response)
+    return 3
+
+
+class RiskScorer:
+    """
+    Holds the tokenizer and model used to score news, together with everything derived from them
+    (the generation pipeline and the key/value cache of each prompt prefix), so they are built only once.
+    Use get_scorer() to get the shared instance, which is created on first use, so importing this module stays cheap.
+
+    Args:
+        model_id (str): Hugging Face model name or local path.
+        backend (str): CPU inference backend, see load_model.
+
+    """
+
+    def __init__(self, model_id=G_LLM, backend=INFERENCE_BACKEND):
+        from transformers import AutoTokenizer
+
+        self.model_id = model_id
+        self.backend = backend
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id)
+        self.model = load_model(backend, model_id)
+
+        # Decoder-only models need left padding so every prompt in a batch ends at the same position
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.tokenizer.padding_side = "left"
+
+        self._pipeline = None
+        self._prefix_caches = {}
+        self._token_ids = None
+
+    def get_pipeline(self):
+        """
+        Build the text generation pipeline on first use and reuse it afterwards.
+
+        Returns:
+            pipeline object: Text generation pipeline around the loaded model.
+        """
+        if self._pipeline is None:
+            from transformers import pipeline
+
+            self._pipeline = pipeline(
+                "text-generation",
+                model=self.model,
+                tokenizer=self.tokenizer,
+                temperature=0.1,
+                do_sample=True,
+                top_k=10,
+                num_return_sequences=1,
+                return_full_text=False,
+                eos_token_id=self.tokenizer.eos_token_id,
+                pad_token_id=self.tokenizer.pad_token_id
+            )
+        return self._pipeline
+
+    def score_token_ids(self):
+        """
+        Look up the vocabulary ids of the answer tokens "1" ... "5".
+
+        Returns:
+            list: Token id for each label in SCORE_LABELS.
+        """
+        if self._token_ids is None:
+            token_ids = []
+            for label in SCORE_LABELS:
+                ids = self.tokenizer.encode(str(label), add_special_tokens=False)
+                if len(ids) != 1:
+                    raise ValueError(f"Risk score '{label}' is not a single token for {self.model_id}")
+                token_ids.append(ids[0])
+            self._token_ids = token_ids
+        return self._token_ids
+
+    def _get_prefix_cache(self, prefix):
+        """
+        Run the shared prompt prefix through the model once and keep its key/value cache for later entries.
+
+        Args:
+            prefix (str): Prompt prefix built with build_prompt_prefix.
+
+        Returns:
+            tuple: (prefix length in tokens, key/value cache), or None if the prefix cannot be cached
+            because its last tokens would merge with the start of the suffix.
+        """
+        if prefix not in self._prefix_caches:
+            prefix_ids = self.tokenizer(prefix)['input_ids']
+            probe_ids = self.tokenizer(prefix + build_prompt_suffix("", "") + " ")['input_ids']
+
+            if probe_ids[:len(prefix_ids)] != prefix_ids:
+                print("⚠️ Prompt prefix does not end on a token boundary, scoring without prefix cache.")
+                self._prefix_caches[prefix] = None
+            else:
+                with torch.no_grad():
+                    output = self.model.base_model(input_ids=torch.tensor([prefix_ids], device=self.model.device),
+                                                   use_cache=True)
+                self._prefix_caches[prefix] = (len(prefix_ids), output.past_key_values)
+
+        return self._prefix_caches[prefix]
+
+    def _last_hidden_states(self, prefix, suffixes):
+        """
+        Compute the final hidden state of every prompt that starts with the same prefix.
+        The prefix key/value cache is reused, so only the entry specific suffix tokens are encoded.
+
+        Args:
+            prefix (str): Shared prompt prefix.
+            suffixes (list): Entry specific prompt suffixes, each ending right before the answer token.
+
+        Returns:
+            torch.Tensor: Hidden state of the last prompt token, one row per suffix.
+        """
+        model = self.model
+        prefix_cache = self._get_prefix_cache(prefix)
+
+        if prefix_cache is None:
+            # Fall back to encoding the full prompts with left padding
+            encoded = self.tokenizer([prefix + suffix for suffix in suffixes], return_tensors="pt", padding=True)
+            attention_mask = encoded["attention_mask"]
+            position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+            return model.base_model(
+                input_ids=encoded["input_ids"].to(model.device),
+                attention_mask=attention_mask.to(model.device),
+                position_ids=position_ids.to(model.device)
+            ).last_hidden_state[:, -1, :]
+
+        prefix_length, cache = prefix_cache
+        suffix_ids = [self.tokenizer(suffix, add_special_tokens=False)['input_ids'] for suffix in suffixes]
+        lengths = torch.tensor([len(ids) for ids in suffix_ids])
+        width = int(lengths.max())
+
+        # Right pad the suffixes, so every row continues directly after the cached prefix
+        input_ids = torch.full((len(suffixes), width), self.tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(suffixes), prefix_length + width), dtype=torch.long)
+        for row, ids in enumerate(suffix_ids):
+            input_ids[row, :len(ids)] = torch.tensor(ids)
+            attention_mask[row, :prefix_length + len(ids)] = 1
+        position_ids = (prefix_length + torch.arange(width)).unsqueeze(0).expand(len(suffixes), -1)
+
+        # The model extends the cache in place, so every batch works on its own copy
+        batch_cache = copy.deepcopy(cache)
+        batch_cache.batch_repeat_interleave(len(suffixes))
+
+        hidden = model.base_model(
+            input_ids=input_ids.to(model.device),
+            attention_mask=attention_mask.to(model.device),
+            position_ids=position_ids.to(model.device),
+            past_key_values=batch_cache,
+            use_cache=True
+        ).last_hidden_state
+        return hidden[torch.arange(len(suffixes)), lengths - 1]
+
+    def score_batch_logits(self, prompts):
+        """
+        Score a batch of prompts with a single forward pass, reading the next-token logits of "1" ... "5".
+
+        Args:
+            prompts (list): (prefix, suffix) pairs built with build_prompt_prefix and build_prompt_suffix.
+
+        Returns:
+            list: (score, probabilities) per prompt, where probabilities is the distribution over SCORE_LABELS.
+        """
+        groups = {}
+        for i, (prefix, _) in enumerate(prompts):
+            groups.setdefault(prefix, []).append(i)
+
+        results = [None] * len(prompts)
+        for prefix, members in groups.items():
+            with torch.no_grad():
+                # The answer follows "Risk score: ", the digit is the next token after the space
+                hidden = self._last_hidden_states(prefix, [prompts[i][1] + " " for i in members])
+                # Project only the last position to the 5 answer tokens instead of the whole vocabulary
+                logits = self.model.get_output_embeddings()(hidden)[:, self.score_token_ids()]
+                probabilities = torch.softmax(logits.float(), dim=-1).cpu()
+
+            for i, probs in zip(members, probabilities.tolist()):
+                score = SCORE_LABELS[max(range(len(probs)), key=probs.__getitem__)]
+                results[i] = (score, probs)
+        return results
+
+    def score_batch_generate(self, prompts):
+        """
+        Score a batch of prompts with free-form generation and parse the score from each response.
+
+        Args:
+            prompts (list): (prefix, suffix) pairs built with build_prompt_prefix and build_prompt_suffix.
+
+        Returns:
+            list: Risk score per prompt.
+        """
+        responses = self.get_pipeline()([prefix + suffix for prefix, suffix in prompts], batch_size=len(prompts))
+        return [parse_risk_score(response[0]['generated_text']) for response in responses]
+
+    def length_buckets(self, indices, prompts, batch_size):
+        """
+        Group prompt indices into batches of similar token length to keep padding small.
+        Prompts with the same prefix are kept together so a batch can share one prefix cache.
+
+        Args:
+            indices (list): Indices of the prompts to be scored.
+            prompts (dict): (prefix, suffix) pair of each index.
+            batch_size (int): Maximum number of prompts per batch.
+
+        Returns:
+            list: Batches of indices, shortest prompts first within each prefix.
+        """
+        if not indices:
+            return []
+        suffix_ids = self.tokenizer([prompts[i][1] for i in indices], add_special_tokens=False)['input_ids']
+        lengths = dict(zip(indices, (len(ids) for ids in suffix_ids)))
+        order = sorted(indices, key=lambda i: (prompts[i][0], lengths[i]))
+        return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+    def fit_content(self, content, max_tokens=MAX_CONTENT_TOKENS, strategy=TRUNCATION_STRATEGY, chunk=CHUNK_LONG_ARTICLES):
+        """
+        Enforce the per-article token budget on the content before it is pasted into the prompt.
+
+        Args:
+            content (str): Content/body of the news/reddit/tweet entry.
+            max_tokens (int): Token budget per article, None disables the budget.
+            strategy (str): "head_tail" keeps the start and the end of the article, "lead" keeps the leading sentences.
+            chunk (bool): Split articles above the budget into chunks that are scored separately instead of truncating.
+
+        Returns:
+            tuple: (pieces, tokens_before, tokens_after) with the content piece(s) to score and the token counts.
+        """
+        content = str(content)
+        encoded = self.tokenizer(content, add_special_tokens=False, return_offsets_mapping=True)
+        offsets = encoded['offset_mapping']
+        tokens_before = len(offsets)
+
+        if max_tokens is None or tokens_before <= max_tokens:
+            return [content], tokens_before, tokens_before
+
+        if chunk:
+            starts = list(range(0, tokens_before, max_tokens))[:MAX_CHUNKS_PER_ARTICLE]
+            pieces = [content[offsets[k][0]:offsets[min(k + max_tokens, tokens_before) - 1][1]] for k in starts]
+            return pieces, tokens_before, min(tokens_before, len(starts) * max_tokens)
+
+        if strategy == "lead":
+            lead = content[:offsets[max_tokens - 1][1]]
+            # Cut back to the last complete sentence if there is one
+            sentence_ends = [m.end() for m in re.finditer(r'[.!?](?=\s)', lead)]
+            if sentence_ends:
+                lead = lead[:sentence_ends[-1]]
+            return [lead], tokens_before, len(self.tokenizer(lead, add_special_tokens=False)['input_ids'])
+
+        # Keep three quarters of the budget from the start and the rest from the end of the article,
+        # at least one token from the start so a tiny budget does not keep the whole article
+        head_tokens = max(1, max_tokens * 3 // 4)
+        tail_tokens = max_tokens - head_tokens
+        head = content[:offsets[head_tokens - 1][1]]
+        fitted = f"{head} ... {content[offsets[tokens_before - tail_tokens][0]:]}" if tail_tokens > 0 else head
+        return [fitted], tokens_before, len(self.tokenizer(fitted, add_special_tokens=False)['input_ids'])
+
+
+# Shared scorer, created by get_scorer() on first use
+_scorer = None
+
+
+def get_scorer():
+    """
+    Return the shared RiskScorer, loading the tokenizer and model on the first call.
+
+    Returns:
+        RiskScorer: The scorer for G_LLM with the configured INFERENCE_BACKEND.
+    """
+    global _scorer
+    if _scorer is None:
+        _scorer = RiskScorer()
+    return _scorer
+
+
+def get_risk_distribution(source, header, content, scorer=None):
+    """
+    Score a news/reddit/tweet entry with constrained single-token decoding.
+
+    Args:
+        source (str): Source of the data ("News", "Reddit", or "Tweet").
+        header (str): Header/title of the news/reddit/tweet entry.
+        content (str): Content/body of the news/reddit/tweet entry.
+        scorer (RiskScorer): Scorer to use, defaults to the shared one.
+
+    Returns:
+        tuple: (score, probabilities) with the argmax risk score and the probability of each score 1-5.
+    """
+    try:
+        scorer = scorer or get_scorer()
+        return scorer.score_batch_logits([(build_prompt_prefix(source), build_prompt_suffix(header, content))])[0]
 
     except Exception as e:
         print(f"[Error in risk score generation] -> {e}")
         sys.exit(1)
 
 
-def get_all_scores(json_data):
+def get_risk_score(source, header, content, mode=SCORING_MODE, scorer=None):
+    """
+    Generate risk score for each news/reddit/tweet entry using the shared scorer.
+
+    Args:
+        source (str): Source of the data ("News", "Reddit", or "Tweet").
+        header (str): Header/title of the news/reddit/tweet entry.
+        content (str): Content/body of the news/reddit/tweet entry.
+        mode (str): "logits" for single-token decoding, "generate" for free-form generation.
+        scorer (RiskScorer): Scorer to use, defaults to the shared one.
+
+    Returns:
+        int: Risk score assigned to the news/reddit/tweet entry.
+    """
+    if mode == "logits":
+        score, _ = get_risk_distribution(source, header, content, scorer=scorer)
+        return score
+
+    try:
+        scorer = scorer or get_scorer()
+        return scorer.score_batch_generate([(build_prompt_prefix(source), build_prompt_suffix(header, content))])[0]
+
+    except Exception as e:
+        print(f"[Error in risk score generation] -> {e}")
+        sys.exit(1)
+
+
+def _save_token_counts(json_data, token_counts):
+    """
+    Save the content token counts before and after applying the token budget to temp/token_counts.csv.
+
+    Args:
+        json_data (json object): The loaded data from reading processed_data.json.
+        token_counts (dict): index -> (tokens_before, tokens_after, number of chunks) for every scored news.
+
+    Returns:
+        None
+    """
+    counts_df = pd.DataFrame([
+        {
+            'datetime': json_data[i]['datetime'],
+            'header': json_data[i]['header'],
+            'tokens_before': before,
+            'tokens_after': after,
+            'chunks': chunks
+        }
+        for i, (before, after, chunks) in token_counts.items()
+    ], columns=['datetime', 'header', 'tokens_before', 'tokens_after', 'chunks'])
+    counts_df.to_csv(TEMP_TOKEN_COUNTS_CSV, index=False)
+
+    print(f"Content tokens: {counts_df['tokens_before'].sum()} before, {counts_df['tokens_after'].sum()} after the budget "
+          f"({(counts_df['tokens_before'] > counts_df['tokens_after']).sum()} of {len(counts_df)} articles shortened)")
+
+
+def _score_entries(entries, batch_size, mode, scorer):
+    """
+    Score news entries with the model, without looking at the score cache.
+
+    Args:
+        entries (list): News entries with 'source', 'header' and 'content'.
+        batch_size (int): Number of prompts sent to the model at once.
+        mode (str): "logits" for single-token decoding, "generate" for free-form generation.
+        scorer (RiskScorer): Scorer holding the model.
+
+    Returns:
+        tuple: (scores, probabilities, token_counts, number of prompts), where token_counts holds
+        (tokens_before, tokens_after, number of chunks) per entry.
+    """
+    # One prompt per article, or one per chunk for articles split into chunks, and the prompts (jobs) of every article
+    prompts, owners, entry_jobs, token_counts = {}, {}, [], []
+    for i, entry in enumerate(entries):
+        pieces, tokens_before, tokens_after = scorer.fit_content(entry['content'])
+        token_counts.append((tokens_before, tokens_after, len(pieces)))
+        entry_jobs.append([])
+        for piece in pieces:
+            job = len(prompts)
+            prompts[job] = (build_prompt_prefix(entry['source']), build_prompt_suffix(entry['header'], piece))
+            owners[job] = i
+            entry_jobs[i].append(job)
+
+    job_scores, job_probabilities = {}, {}
+    for batch in tqdm(scorer.length_buckets(list(prompts), prompts, batch_size), desc="Generating risk scores"):
+        batch_prompts = [prompts[job] for job in batch]
+
+        if mode == "logits":
+            for job, (score, probs) in zip(batch, scorer.score_batch_logits(batch_prompts)):
+                job_scores[job], job_probabilities[job] = score, probs
+        else:
+            for job, score in zip(batch, scorer.score_batch_generate(batch_prompts)):
+                print(f"Data entry number {owners[job]}:\n")
+                job_scores[job] = score
+
+    # Pool the chunk scores of each article
+    scores, probabilities = [], []
+    for jobs in entry_jobs:
+        if mode == "logits":
+            pooled = [sum(job_probabilities[job][k] for job in jobs) / len(jobs) for k in range(len(SCORE_LABELS))]
+            scores.append(SCORE_LABELS[max(range(len(pooled)), key=pooled.__getitem__)])
+            probabilities.append(pooled)
+        else:
+            scores.append(round(sum(job_scores[job] for job in jobs) / len(jobs)))
+            probabilities.append(None)
+
+    return scores, probabilities, token_counts, len(prompts)
+
+
+def _init_worker(threads, model_id, backend):
+    """
+    Set up a scoring worker process with a fixed torch thread count and its own model replica.
+    """
+    global _scorer
+    torch.set_num_threads(threads)
+    _scorer = RiskScorer(model_id, backend)
+
+
+def _score_shard(shard):
+    """
+    Score one shard of news entries in a worker process.
+    """
+    entries, batch_size, mode = shard
+    return _score_entries(entries, batch_size, mode, _scorer)
+
+
+def _threads_per_worker(threads_per_worker, n_workers):
+    # None splits the CPU cores evenly between the workers
+    return threads_per_worker or max(1, (os.cpu_count() or 1) // max(1, n_workers))
+
+
+def open_worker_pool(n_workers=NUM_WORKERS, threads_per_worker=TORCH_THREADS_PER_WORKER, model_id=G_LLM,
+                     backend=INFERENCE_BACKEND):
+    """
+    Start the scoring worker processes once, for callers that call get_all_scores many times (e.g. the backfill).
+    Use it as a context manager and pass it as get_all_scores(pool=...), every worker then loads its model replica
+    only once. With n_workers <= 1 it gives None, and get_all_scores scores in this process.
+
+    Args:
+        n_workers (int): Number of worker processes (model replicas).
+        threads_per_worker (int): torch intra-op threads of each worker, None splits the CPU cores evenly.
+        model_id (str): Model loaded by the workers.
+        backend (str): CPU inference backend of the workers.
+
+    Returns:
+        multiprocessing Pool or contextlib.nullcontext: The pool, closed when the with block is left.
+    """
+    if n_workers <= 1:
+        return contextlib.nullcontext()
+    # Spawned workers do not inherit the torch thread pools of this process
+    context = multiprocessing.get_context("spawn")
+    return context.Pool(n_workers, initializer=_init_worker,
+                        initargs=(_threads_per_worker(threads_per_worker, n_workers), model_id, backend))
+
+
+def _score_entries_parallel(entries, batch_size, mode, n_workers, threads_per_worker, model_id, backend, pool=None):
+    """
+    Shard news entries across worker processes that each hold one model replica and merge the results in input order.
+
+    Args:
+        entries (list): News entries with 'source', 'header' and 'content'.
+        batch_size (int): Number of prompts sent to the model at once in each worker.
+        mode (str): "logits" for single-token decoding, "generate" for free-form generation.
+        n_workers (int): Number of worker processes (model replicas).
+        threads_per_worker (int): torch intra-op threads of each worker.
+        model_id (str): Model loaded by the workers.
+        backend (str): CPU inference backend of the workers.
+        pool (multiprocessing Pool): Workers from open_worker_pool, None starts workers for this call only.
+
+    Returns:
+        tuple: Same as _score_entries.
+    """
+    n_shards = min(n_workers, len(entries))
+    # Contiguous shards, so concatenating the results keeps the input order
+    bounds = [len(entries) * k // n_shards for k in range(n_shards + 1)]
+    shards = [(entries[bounds[k]:bounds[k + 1]], batch_size, mode) for k in range(n_shards)]
+
+    if pool is not None:
+        results = pool.map(_score_shard, shards)
+    else:
+        with open_worker_pool(n_shards, threads_per_worker, model_id, backend) as call_pool:
+            results = call_pool.map(_score_shard, shards)
+
+    scores, probabilities, token_counts, n_prompts = [], [], [], 0
+    for shard_scores, shard_probabilities, shard_token_counts, shard_prompts in results:
+        scores.extend(shard_scores)
+        probabilities.extend(shard_probabilities)
+        token_counts.extend(shard_token_counts)
+        n_prompts += shard_prompts
+    return scores, probabilities, token_counts, n_prompts
+
+
+def get_all_scores(json_data, batch_size=BATCH_SIZE, mode=SCORING_MODE, return_probs=False, use_cache=True, scorer=None,
+                   n_workers=NUM_WORKERS, threads_per_worker=TORCH_THREADS_PER_WORKER, pool=None):
     """Function to get risk score for every news in the processed json file.
 
+    News that were already scored with the same model and prompt version are read from the score cache.
+    The content of the remaining news is fitted into the token budget (see RiskScorer.fit_content), the prompts are
+    sorted by token length and sent to the model in padded batches. Scores of articles split into chunks
+    are pooled, and all scores are put back in the original order of json_data.
+    The model is only loaded if at least one news is missing from the cache.
+    With n_workers > 1 the news are sharded across worker processes that each load their own model replica,
+    started for this call, or kept open across calls when a pool from open_worker_pool is given.
+
     Args:
         json_data (json object): The loaded data from reading processed_data.json.
+        batch_size (int): Number of prompts sent to the model at once.
+        mode (str): "logits" for single-token decoding, "generate" for free-form generation.
+        return_probs (bool): Also return the score distribution of each news ("logits" mode only).
+        use_cache (bool): Look up and store scores in the on-disk score cache.
+        scorer (RiskScorer): Scorer to use, defaults to the shared one.
+        n_workers (int): Number of scoring processes, 1 scores in this process.
+        threads_per_worker (int): torch intra-op threads per process, None splits the CPU cores evenly.
+        pool (multiprocessing Pool): Workers from open_worker_pool(n_workers, ...) to use instead of starting new ones.
 
     Returns:
         risk_score (list): A list of generated risk score for each news extracted.
+        probabilities (list): Only if return_probs is set, the probability of each score 1-5 per news.
     """
-    for i in tqdm(range(len(json_data)), desc="Generating risk scores"):
-        print(f"Data entry number {i}:\n")
-        source = json_data[i]['source']
-        header = json_data[i]['header']
-        content = json_data[i]['content']
+    try:
+        scores = [3] * len(json_data)
+        probabilities = [None] * len(json_data)
+        todo = list(range(len(json_data)))
+        model_id, backend = (scorer.model_id, scorer.backend) if scorer else (G_LLM, INFERENCE_BACKEND)
 
-        get_risk_score(source, header, content)
-    
-    print(f'All risk scores: {risk_scores}')
+        if use_cache:
+            # The token budget changes what the model sees, so it is part of the cache version
+            budget = f"{MAX_CONTENT_TOKENS}-{TRUNCATION_STRATEGY}-{'chunk' if CHUNK_LONG_ARTICLES else 'truncate'}"
+            cache = ScoreCache(SCORE_CACHE_DB, f"{model_id}-{backend}", f"{PROMPT_VERSION}-{mode}-{budget}",
+                               SCORE_CACHE_MAX_ENTRIES)
+            keys = [cache.make_key(entry['source'], entry['header'], entry['content']) for entry in json_data]
+            cached = cache.get_many(keys)
+            for i, key in enumerate(keys):
+                if key in cached:
+                    scores[i], probabilities[i] = cached[key]
+            todo = [i for i, key in enumerate(keys) if key not in cached]
+
+        threads_per_worker = _threads_per_worker(threads_per_worker, n_workers)
+        entries = [json_data[i] for i in todo]
+        n_prompts = 0
+
+        start_time = time.perf_counter()
+        if n_workers > 1 and len(entries) > 1:
+            results = _score_entries_parallel(entries, batch_size, mode, n_workers, threads_per_worker, model_id, backend,
+                                              pool)
+        elif entries:
+            torch.set_num_threads(threads_per_worker)
+            results = _score_entries(entries, batch_size, mode, scorer or get_scorer())
+        else:
+            results = None
+        elapsed = time.perf_counter() - start_time
+
+        if results:
+            entry_scores, entry_probabilities, token_counts, n_prompts = results
+            for i, score, probs in zip(todo, entry_scores, entry_probabilities):
+                scores[i], probabilities[i] = score, probs
+            _save_token_counts(json_data, dict(zip(todo, token_counts)))
+
+        if use_cache:
+            cache.put_many([(keys[i], scores[i], probabilities[i]) for i in todo])
+            print(f"Score cache: {cache.hits} hits, {cache.misses} misses ({cache.hit_rate():.1%} hit rate)")
+            cache.close()
+
+    except Exception as e:
+        print(f"[Error in risk score generation] -> {e}")
+        sys.exit(1)
+
+    print(f'All risk scores: {scores}')
+    print(f"Scored {len(todo)} articles ({n_prompts} prompts) in {elapsed:.1f}s "
+          f"({len(todo) / elapsed if elapsed else 0:.2f} articles/sec, batch size {batch_size}, mode '{mode}', "
+          f"{n_workers} worker(s) x {threads_per_worker} thread(s))")
     print("Risk score generation completed.")
-    
-    return risk_scores
+
+    if return_probs:
+        return scores, probabilities
+    return scores
 
 
 def save_tmp_csv(temp_df):
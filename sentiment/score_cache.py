@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+class ScoreCache:
+    """
+    On-disk SQLite cache of generated risk scores, so reruns of the sentiment pipeline only score news it has not seen before.
+    Every entry is keyed by a hash of the news source, header and content together with the model id and prompt version,
+    so changing the model or the prompt never returns stale scores.
+    Once the cache holds more than max_entries rows, the least recently used ones are evicted.
+
+    Args:
+        path (str): File path of the SQLite database.
+        model_id (str): Name of the model that generated the scores.
+        prompt_version (str): Version of the prompt template (and scoring mode) used for the scores.
+        max_entries (int): Maximum number of cached scores kept on disk.
+
+    """
+
+    def __init__(self, path, model_id, prompt_version, max_entries):
+        self.model_id = model_id
+        self.prompt_version = prompt_version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS scores (
+                key TEXT PRIMARY KEY,
+                score INTEGER NOT NULL,
+                probabilities TEXT,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_scores_last_used ON scores (last_used)")
+        self.conn.commit()
+
+    def make_key(self, source, header, content):
+        """
+        Build the cache key of a news/reddit/tweet entry.
+
+        Args:
+            source (str): Source of the data ("News", "Reddit", or "Tweet").
+            header (str): Header/title of the entry.
+            content (str): Content/body of the entry.
+
+        Returns:
+            str: Hex digest identifying the entry, model and prompt version.
+        """
+        payload = json.dumps([source, header, content, self.model_id, self.prompt_version], default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        """
+        Look up cached scores and refresh their last used time.
+
+        Args:
+            keys (list): Cache keys built with make_key.
+
+        Returns:
+            dict: key -> (score, probabilities) for every key found in the cache.
+        """
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        # Stay below SQLite's limit on the number of query parameters
+        for i in range(0, len(unique_keys), 500):
+            chunk = unique_keys[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT key, score, probabilities FROM scores WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for key, score, probabilities in rows:
+                found[key] = (score, json.loads(probabilities) if probabilities else None)
+
+        now = time.time()
+        self.conn.executemany("UPDATE scores SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+        self.conn.commit()
+
+        self.hits += sum(1 for key in keys if key in found)
+        self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, entries):
+        """
+        Store new scores and evict the least recently used entries above max_entries.
+
+        Args:
+            entries (list): (key, score, probabilities) tuples, probabilities may be None.
+
+        Returns:
+            None
+        """
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO scores (key, score, probabilities, last_used) VALUES (?, ?, ?, ?)",
+            [(key, int(score), json.dumps(probs) if probs is not None else None, now) for key, score, probs in entries]
+        )
+        self.conn.execute(
+            "DELETE FROM scores WHERE key IN (SELECT key FROM scores ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self.conn.commit()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self):
+        self.conn.close()
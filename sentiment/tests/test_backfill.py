@@ -0,0 +1,120 @@
+from datetime import date
+import json
+import os
+import pandas as pd
+import pytest
+import backfill
+from risk_score_aggregation import _floor_time_half_hour
+
+NEWS = pd.DataFrame({
+    "datetime": pd.to_datetime(["2025-05-01 10:10:00", "2025-05-02 11:20:00"]),
+    "header": ["first", "second"],
+    "content": ["a", "b"],
+    "source": ["News", "News"],
+    "specific_source": ["Fool", "Fool"],
+    "link": ["x", "y"],
+})
+
+
+def _setup(tmp_path, monkeypatch, news=NEWS):
+    news_with_score = tmp_path / "news_with_risk_score.csv"
+    partials = tmp_path / "aggregated_risk_partials.csv"
+    appended = []
+
+    def append_score_to_csv(json_data, scores, path):
+        appended.append(pd.DataFrame(json_data))
+        pd.DataFrame(json_data).assign(score=scores).to_csv(path, mode="a", header=False, index=False)
+
+    # Writes the (bin, news day) pairs of the last appended day, like the real aggregation
+    def aggregate_risk_score(path):
+        day = appended[-1]
+        dates = pd.to_datetime(day["datetime"])
+        rows = pd.DataFrame({"datetime": _floor_time_half_hour(dates).dt.strftime("%Y-%m-%d %H:%M:%S"),
+                             "news_date": dates.dt.strftime("%Y-%m-%d"), "weighted_score_sum": 0.0, "weight_sum": 0.0})
+        rows.to_csv(partials, mode="a", header=not os.path.exists(partials), index=False)
+
+    monkeypatch.setattr(backfill, "load_news", lambda path, start, end: news)
+    monkeypatch.setattr(backfill, "get_all_scores", lambda json_data, pool=None: [3] * len(json_data))
+    monkeypatch.setattr(backfill, "append_score_to_csv", append_score_to_csv)
+    monkeypatch.setattr(backfill, "aggregate_risk_score", aggregate_risk_score)
+    monkeypatch.setattr(backfill, "NEWS_WITH_SCORE_CSV", str(news_with_score))
+    monkeypatch.setattr(backfill, "BACKFILL_CHECKPOINT_JSON", str(tmp_path / "backfill_checkpoint.json"))
+    monkeypatch.setattr(backfill, "AGGREGATED_PARTIALS_CSV", str(partials))
+    return news_with_score
+
+
+def _headers(news_with_score):
+    return pd.read_csv(news_with_score, header=None)[1].tolist()
+
+
+def test_interrupted_day_is_not_appended_twice(tmp_path, monkeypatch):
+    news_with_score = _setup(tmp_path, monkeypatch)
+    aggregate = backfill.aggregate_risk_score
+
+    # Interrupted after the rows of the second day were appended, before its checkpoint
+    def interrupt_on_second_day(path):
+        if len(pd.read_csv(news_with_score, header=None)) == 2:
+            raise KeyboardInterrupt
+        aggregate(path)
+    monkeypatch.setattr(backfill, "aggregate_risk_score", interrupt_on_second_day)
+    with pytest.raises(KeyboardInterrupt):
+        backfill.run_backfill(date(2025, 5, 1), date(2025, 5, 2))
+
+    monkeypatch.setattr(backfill, "aggregate_risk_score", aggregate)
+    backfill.run_backfill(date(2025, 5, 1), date(2025, 5, 2))
+
+    assert _headers(news_with_score) == ["first", "second"]
+
+
+def test_changed_model_restarts_backfill(tmp_path, monkeypatch):
+    news_with_score = _setup(tmp_path, monkeypatch)
+    backfill.run_backfill(date(2025, 5, 1), date(2025, 5, 2))
+
+    # Same model and prompt: nothing is scored again
+    backfill.run_backfill(date(2025, 5, 1), date(2025, 5, 2))
+    assert len(_headers(news_with_score)) == 2
+
+    monkeypatch.setattr(backfill, "G_LLM", "other-model")
+    backfill.run_backfill(date(2025, 5, 1), date(2025, 5, 2))
+    assert len(_headers(news_with_score)) == 4
+    with open(tmp_path / "backfill_checkpoint.json") as f:
+        assert json.load(f)["model"].startswith("other-model")
+
+    # Days rescored with the new model count as aggregated again
+    backfill.run_backfill(date(2025, 5, 1), date(2025, 5, 2))
+    assert len(_headers(news_with_score)) == 4
+
+
+def test_later_news_of_completed_day_is_scored(tmp_path, monkeypatch):
+    news_with_score = _setup(tmp_path, monkeypatch)
+    backfill.run_backfill(date(2025, 5, 1), date(2025, 5, 2))
+
+    late = pd.DataFrame({"datetime": pd.to_datetime(["2025-05-01 15:00:00"]), "header": ["late"], "content": ["c"],
+                         "source": ["News"], "specific_source": ["Fool"], "link": ["z"]})
+    monkeypatch.setattr(backfill, "load_news", lambda path, start, end: pd.concat([NEWS, late], ignore_index=True))
+    backfill.run_backfill(date(2025, 5, 1), date(2025, 5, 2))
+
+    assert "late" in _headers(news_with_score)
+
+
+def test_one_worker_pool_for_the_whole_range(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    opened, used = [], []
+
+    class FakePool:
+        def __enter__(self):
+            opened.append(self)
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    def get_all_scores(json_data, pool=None):
+        used.append(pool)
+        return [3] * len(json_data)
+    monkeypatch.setattr(backfill, "open_worker_pool", FakePool)
+    monkeypatch.setattr(backfill, "get_all_scores", get_all_scores)
+
+    backfill.run_backfill(date(2025, 5, 1), date(2025, 5, 2))
+    assert len(opened) == 1
+    assert used == [opened[0], opened[0]]
@@ -0,0 +1,39 @@
+import os
+import pandas as pd
+import data_preprocessing
+from data_preprocessing import load_news, NEWS_COLUMNS
+
+NEWS = pd.DataFrame({
+    # Thursday, and a Saturday that moves to Monday 09:00
+    "datetime": pd.to_datetime(["2025-05-01 10:10:00", "2025-05-03 12:00:00"]),
+    "header": ["first", "second"],
+    "content": ["a", "b"],
+    "source": ["News", "News"],
+    "specific_source": ["Fool", "Fool"],
+    "link": ["x", "y"],
+})
+
+
+def test_default_call_reads_all_partitions(tmp_path, monkeypatch):
+    root = tmp_path / "news_parquet"
+    for day, rows in NEWS.groupby(NEWS["datetime"].dt.date):
+        os.makedirs(root / f"date={day}")
+        rows.to_parquet(root / f"date={day}" / "news.parquet", index=False)
+    monkeypatch.setattr(data_preprocessing, "NEWS_STORAGE", "parquet")
+    monkeypatch.setattr(data_preprocessing, "RAW_DATA_PARQUET", str(root))
+
+    df = load_news(str(tmp_path / "news.csv"))
+    assert df["header"].tolist() == ["first", "second"]
+    assert df["datetime"].tolist() == [pd.Timestamp("2025-05-01 10:10:00"), pd.Timestamp("2025-05-05 09:00:00")]
+
+
+def test_default_call_reads_whole_csv(tmp_path, monkeypatch):
+    path = tmp_path / "news.csv"
+    NEWS.rename(columns={"datetime": "Date and Timestamp", "header": "Title", "content": "Full Text", "source": "Source",
+                         "specific_source": "SpecificSource", "link": "Link"}).to_csv(path, sep=";", index=False)
+    monkeypatch.setattr(data_preprocessing, "NEWS_STORAGE", "csv")
+    monkeypatch.setattr(data_preprocessing, "NEWS_INDEX_JSON", str(tmp_path / "news_index.json"))
+
+    df = load_news(str(path))
+    assert df.columns.tolist() == NEWS_COLUMNS
+    assert df["header"].tolist() == ["first", "second"]
@@ -0,0 +1,34 @@
+import re
+import pytest
+from risk_score_generation import RiskScorer
+
+
+class WordTokenizer:
+    # One token per word, with the same output keys as a Hugging Face tokenizer
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=False):
+        offsets = [(m.start(), m.end()) for m in re.finditer(r'\S+', text)]
+        encoded = {'input_ids': list(range(len(offsets)))}
+        if return_offsets_mapping:
+            encoded['offset_mapping'] = offsets
+        return encoded
+
+
+@pytest.fixture
+def scorer():
+    scorer = RiskScorer.__new__(RiskScorer)
+    scorer.tokenizer = WordTokenizer()
+    return scorer
+
+
+def test_head_tail_with_budget_of_one_token(scorer):
+    pieces, before, after = scorer.fit_content("one two three four", max_tokens=1, strategy="head_tail", chunk=False)
+    assert pieces == ["one"]
+    assert (before, after) == (4, 1)
+
+
+def test_head_tail_reports_tokens_of_result(scorer):
+    content = " ".join(f"w{i}" for i in range(20))
+    pieces, before, after = scorer.fit_content(content, max_tokens=8, strategy="head_tail", chunk=False)
+    assert pieces == ["w0 w1 w2 w3 w4 w5 ... w18 w19"]
+    # Six head and two tail tokens, plus the "..." separator
+    assert (before, after) == (20, 9)
@@ -0,0 +1,46 @@
+import pandas as pd
+import risk_score_aggregation
+from config import SOURCE_WEIGHTS
+
+
+def _run_day(tmp_path, rows):
+    date_risk = tmp_path / "date_risk.csv"
+    pd.DataFrame(rows, columns=["datetime", "source", "specific_source", "risk score"]).to_csv(date_risk, index=False)
+    risk_score_aggregation.aggregate_risk_score(str(date_risk))
+    return pd.read_csv(risk_score_aggregation.AGGREGATED_WEIGHTS_CSV, dtype={"datetime": str})
+
+
+def test_bin_spanning_midnight_adds_both_days(tmp_path, monkeypatch):
+    monkeypatch.setattr(risk_score_aggregation, "AGGREGATED_WEIGHTS_CSV", str(tmp_path / "aggregated_risk_scores.csv"))
+    monkeypatch.setattr(risk_score_aggregation, "AGGREGATED_PARTIALS_CSV", str(tmp_path / "aggregated_risk_partials.csv"))
+
+    day_1 = [
+        ["2025-04-30 10:10:00", "News", "Fool", 3],
+        ["2025-04-30 23:40:00", "News", "Fool", 1],
+    ]
+    day_2 = [
+        # 00:10 belongs to the 23:30 bin of the previous day
+        ["2025-05-01 00:10:00", "News", "Forbes", 5],
+        ["2025-05-01 00:20:00", "News", "Forbes", 5],
+        ["2025-05-01 08:45:00", "News", "Forbes", 2],
+    ]
+
+    after_day_1 = _run_day(tmp_path, day_1)
+    assert after_day_1.set_index("datetime")["avg_weighted_score"].to_dict() == {
+        "2025-04-30 09:30:00": 3,
+        "2025-04-30 23:30:00": 1,
+    }
+
+    after_day_2 = _run_day(tmp_path, day_2)
+    fool, forbes = SOURCE_WEIGHTS["Fool"], SOURCE_WEIGHTS["Forbes"]
+    expected_2330 = round((1 * fool + 2 * 5 * forbes) / (fool + 2 * forbes))
+    assert expected_2330 == 4
+    assert after_day_2.set_index("datetime")["avg_weighted_score"].to_dict() == {
+        "2025-04-30 09:30:00": 3,
+        "2025-04-30 23:30:00": expected_2330,
+        "2025-05-01 08:30:00": 2,
+    }
+
+    # Rerunning a day replaces its own sums instead of adding them again
+    assert _run_day(tmp_path, day_2).equals(after_day_2)
+    assert _run_day(tmp_path, day_1).equals(after_day_2)
@@ -0,0 +1,46 @@
+import risk_score_generation
+
+
+def test_get_all_scores_uses_given_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(risk_score_generation, "TEMP_TOKEN_COUNTS_CSV", str(tmp_path / "token_counts.csv"))
+
+    def no_new_pool(*args, **kwargs):
+        raise AssertionError("a new worker pool was started")
+    monkeypatch.setattr(risk_score_generation, "open_worker_pool", no_new_pool)
+
+    class FakePool:
+        def __init__(self):
+            self.shards = []
+
+        def map(self, func, shards):
+            self.shards.append(shards)
+            # Every shard scores its entries with 4, like _score_entries returns them
+            return [([4] * len(entries), [None] * len(entries), [(1, 1, 1)] * len(entries), len(entries))
+                    for entries, batch_size, mode in shards]
+
+    entries = [{"datetime": f"2025-05-01 10:0{i}:00", "header": f"h{i}", "content": "c", "source": "News"}
+               for i in range(5)]
+    pool = FakePool()
+    for _ in range(2):
+        assert risk_score_generation.get_all_scores(entries, use_cache=False, n_workers=2, pool=pool) == [4] * 5
+    # Two calls, each split into one shard per worker
+    assert [len(shards) for shards in pool.shards] == [2, 2]
+
+
+def test_chunk_scores_are_pooled_per_article():
+    scorer = risk_score_generation.RiskScorer.__new__(risk_score_generation.RiskScorer)
+    # Content split into chunks at "|"
+    scorer.fit_content = lambda content: (content.split("|"), 1, len(content.split("|")))
+    scorer.length_buckets = lambda indices, prompts, batch_size: [list(reversed(indices))]
+    # A chunk with "bad" in it is surely a 5, any other chunk a 1
+    scorer.score_batch_logits = lambda prompts: [
+        (5, [0, 0, 0, 0, 1]) if "bad" in suffix else (1, [1, 0, 0, 0, 0]) for prefix, suffix in prompts]
+
+    entries = [{"source": "News", "header": "h0", "content": "bad|good|bad"},
+               {"source": "News", "header": "h1", "content": "good"},
+               {"source": "News", "header": "h2", "content": "good|bad"}]
+    scores, probabilities, token_counts, n_prompts = risk_score_generation._score_entries(entries, 8, "logits", scorer)
+
+    assert scores == [5, 1, 1]
+    assert probabilities == [[1 / 3, 0, 0, 0, 2 / 3], [1, 0, 0, 0, 0], [0.5, 0, 0, 0, 0.5]]
+    assert n_prompts == 6